@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, Union
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_FOLDER)
+
+from dbase import SqliteDbase
+from loader import Loader
+from processing import Processing
+from plotting import Plotting
+from synthetic_project import SyntheticScale, generate_project
+
+
+DEFAULT_TOLERANCE = 1.2
+CHECKING_CONCLUSION = 'Good'
+
+
+def get_peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def count_records(dbase: SqliteDbase, table: str) -> int:
+    return dbase.fetch_one(f'SELECT COUNT(1) FROM {table};')[0]
+
+
+def count_files(folder: str) -> int:
+    return sum((len(files) for _, _, files in os.walk(folder)))
+
+
+def reset_memory_peak():
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+def create_stage_result(seconds: float, items: int,
+                        cumulative_peak_rss_mb: float,
+                        stage_peak_mb: Union[float, None] = None
+                        ) -> Dict[str, float]:
+    throughput = items / seconds if seconds else 0.
+    result = {'seconds': round(seconds, 4), 'items': items,
+              'throughput': round(throughput, 4),
+              'cumulative_peak_rss_mb': round(cumulative_peak_rss_mb, 2)}
+    if stage_peak_mb is not None:
+        result['stage_peak_mb'] = round(stage_peak_mb, 2)
+    return result
+
+
+class Benchmark:
+    def __init__(self, root: str, scale: SyntheticScale, seed=0,
+                 is_memory_tracing=False):
+        self.root = root
+        self.scale = scale
+        self.is_memory_tracing = is_memory_tracing
+        self.config_path = generate_project(root, scale, seed)
+        self.results = dict()
+        self.logger = logging.getLogger('Benchmark')
+
+    def run_stage(self, name: str, func: Callable[[], None],
+                  count_func: Callable[[], int]):
+        self.logger.info(f'Stage {name} started')
+        if self.is_memory_tracing:
+            if tracemalloc.is_tracing():
+                reset_memory_peak()
+            else:
+                tracemalloc.start()
+        time_start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - time_start
+        stage_peak_mb = None
+        if self.is_memory_tracing and tracemalloc.is_tracing():
+            stage_peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        self.results[name] = create_stage_result(
+            seconds, count_func(), get_peak_rss_mb(), stage_peak_mb)
+        self.logger.info(f'Stage {name} finished: {self.results[name]}')
+
+    def mark_seismic_files_checked(self, processing: Processing):
+        for file_id, _, components in \
+                processing.dbase.get_seismic_files_for_checking():
+            for component in components:
+                processing.dbase.update_seis_file_checking_status(
+                    file_id, component, CHECKING_CONCLUSION)
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        loader = Loader(self.config_path)
+        self.run_stage('ingest', loader.run,
+                       lambda: count_records(loader.dbase, 'seis_files') +
+                       count_records(loader.dbase, 'grav_dat_files'))
+
+        processing = Processing(self.config_path)
+        self.mark_seismic_files_checked(processing)
+
+        self.run_stage('processing', processing.run,
+                       lambda: count_records(processing.dbase,
+                                             'measure_pairs'))
+
+        plotting = Plotting(self.config_path)
+        self.run_stage('plots', plotting.run,
+                       lambda: count_files(plotting.export_folder_path))
+        return self.results
+
+    def to_dict(self) -> dict:
+        return {'scale': self.scale._asdict(), 'stages': self.results}
+
+
+def compare_with_baseline(results: dict, baseline: dict,
+                          tolerance=DEFAULT_TOLERANCE) -> Dict[str, float]:
+    regressions = dict()
+    for name, stage in results['stages'].items():
+        base_stage = baseline['stages'].get(name)
+        if not base_stage or not base_stage['seconds']:
+            continue
+        ratio = stage['seconds'] / base_stage['seconds']
+        print(f'{name:<12} {stage["seconds"]:>10.3f} s  '
+              f'baseline {base_stage["seconds"]:>10.3f} s  x{ratio:.2f}')
+        if ratio > tolerance:
+            regressions[name] = ratio
+    return regressions
+
+
+def load_json(path: str) -> Union[dict, None]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as file_ctx:
+        return json.load(file_ctx)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='End-to-end benchmark')
+    parser.add_argument('--stations', type=int, default=4)
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--frequency', type=int, default=250)
+    parser.add_argument('--session-minutes', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default='',
+                        help='folder for synthetic project, temporary '
+                             'if not set')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default='')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float,
+                        default=DEFAULT_TOLERANCE)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='measure per-stage peak of Python allocations '
+                             'with tracemalloc (slows the stages down)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='filesorter-bench-')
+    scale_params = SyntheticScale(args.stations, args.days, args.frequency,
+                                  args.session_minutes)
+
+    benchmark = Benchmark(workdir, scale_params, args.seed,
+                          args.trace_memory)
+    benchmark.run()
+    report = benchmark.to_dict()
+    with open(args.output, 'w') as output_ctx:
+        json.dump(report, output_ctx, indent=4)
+
+    if not args.workdir:
+        shutil.rmtree(workdir)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as output_ctx:
+            json.dump(report, output_ctx, indent=4)
+        sys.exit(0)
+
+    baseline_report = load_json(args.baseline) if args.baseline else None
+    if baseline_report is None:
+        sys.exit(0)
+
+    if baseline_report['scale'] != report['scale']:
+        print('Baseline was recorded at another scale')
+    slow_stages = compare_with_baseline(report, baseline_report,
+                                        args.tolerance)
+    if slow_stages:
+        print(f'Regressions: {", ".join(slow_stages)}')
+        sys.exit(1)
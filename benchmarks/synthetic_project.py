@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import struct
+import argparse
+from datetime import datetime
+from datetime import timedelta
+from typing import List, NamedTuple
+
+import numpy as np
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_FOLDER)
+
+from config import STRUCTURE
+from gravic_files import DAT_HEADER_FIRST_LINE, CYCLE_HEADER_FIRST_LINE
+from gravic_files import DAT_FIRST_LINE_INDEX, TSF_FIRST_LINE_INDEX
+from gravic_files import TSF_SIGNAL_FREQUENCY
+from seismic_reader import HEADER_BASE_SIZE, HEADER_CHANNEL_SIZE
+
+
+CONFIG_FILENAME = 'config.json'
+COORDINATES_FILENAME = 'point_coords.csv'
+GRAVIMETER_NUMBER = '40123'
+SENSOR_PART_NAME = 'S0123'
+SEISMOMETER_NUMBER = 'A001'
+START_DATE = datetime(2021, 7, 1, 8, 0, 0)
+SESSION_GAP_MINUTES = 5
+SEISMIC_MARGIN_MINUTES = 2
+SEISMIC_CHANNELS_COUNT = 3
+BASE_GRAVITY = 5432.1234
+
+
+class SyntheticScale(NamedTuple):
+    stations: int
+    days: int
+    seismic_frequency: int
+    session_minutes: int
+
+
+class Session(NamedTuple):
+    station: str
+    link_index: int
+    datetime_start: datetime
+    minutes: int
+
+
+def format_station(index: int) -> str:
+    return str(1000 + index)
+
+
+def create_sessions(scale: SyntheticScale, day: int) -> List[Session]:
+    sessions = []
+    day_start = START_DATE + timedelta(days=day)
+    for i in range(scale.stations):
+        shift = i * (scale.session_minutes + SESSION_GAP_MINUTES +
+                     2 * SEISMIC_MARGIN_MINUTES)
+        dt_start = day_start + timedelta(minutes=shift)
+        sessions.append(Session(format_station(i), i, dt_start,
+                                scale.session_minutes))
+    return sessions
+
+
+def get_dat_filename(session: Session) -> str:
+    date_str = session.datetime_start.strftime('%Y%m%d')
+    return f'{date_str}_{session.station}_{session.link_index}.dat'
+
+
+def write_dat_file(path: str, session: Session, rnd: np.random.RandomState):
+    lines = [DAT_HEADER_FIRST_LINE, '/\tSynthetic project',
+             f'/\tInstrument S/N:\t{GRAVIMETER_NUMBER}']
+    while len(lines) < DAT_FIRST_LINE_INDEX:
+        lines.append(f'/\tHeader line {len(lines)}')
+
+    gravity = BASE_GRAVITY + rnd.normal(0, 0.01, session.minutes)
+    for i in range(session.minutes):
+        dt_val = session.datetime_start + timedelta(minutes=i + 1)
+        lines.append('\t'.join([
+            session.station, dt_val.strftime('%Y-%m-%d'),
+            dt_val.strftime('%H:%M:%S'), f'{gravity[i]:.4f}',
+            f'{rnd.uniform(0.001, 0.05):.4f}']))
+
+    with open(path, 'w') as file_ctx:
+        file_ctx.write('\n'.join(lines) + '\n')
+
+
+def write_chain_files(folder: str, day_start: datetime,
+                      sessions: List[Session],
+                      rnd: np.random.RandomState):
+    base_name = f'{day_start.strftime("%Y%m%d")}_{SENSOR_PART_NAME}'
+    with open(os.path.join(folder, base_name + '.txt'), 'w') as file_ctx:
+        for session in sessions:
+            file_ctx.write(get_dat_filename(session) + '\n')
+
+    cycle_path = os.path.join(folder, base_name + '_cycles.txt')
+    with open(cycle_path, 'w') as file_ctx:
+        file_ctx.write(CYCLE_HEADER_FIRST_LINE + '\n')
+        for session in sessions:
+            for cycle in range(1, session.minutes + 1):
+                is_bad = int(rnd.uniform() < 0.05)
+                file_ctx.write(
+                    f'{session.link_index}\t{cycle}\t{is_bad}\t0\n')
+
+
+def write_tsf_file(path: str, datetime_start: datetime,
+                   datetime_stop: datetime, rnd: np.random.RandomState):
+    lines = [f'[TSF-file] synthetic {i}'
+             for i in range(TSF_FIRST_LINE_INDEX)]
+    seconds = int((datetime_stop - datetime_start).total_seconds())
+    signal = rnd.normal(0, 200, (seconds, TSF_SIGNAL_FREQUENCY)).astype(int)
+    for i in range(seconds):
+        dt_val = datetime_start + timedelta(seconds=i + 1)
+        values = ' '.join((str(x) for x in signal[i]))
+        lines.append(dt_val.strftime('%Y %m %d %H %M %S ') + values)
+
+    with open(path, 'w') as file_ctx:
+        file_ctx.write('\n'.join(lines) + '\n')
+
+
+def write_seismic_file(path: str, datetime_start: datetime, seconds: int,
+                       frequency: int, rnd: np.random.RandomState):
+    header = bytearray(HEADER_BASE_SIZE +
+                       HEADER_CHANNEL_SIZE * SEISMIC_CHANNELS_COUNT)
+    struct.pack_into('H', header, 0, SEISMIC_CHANNELS_COUNT)
+    struct.pack_into('HHH', header, 6, datetime_start.day,
+                     datetime_start.month, datetime_start.year)
+    day_seconds = (datetime_start - datetime(datetime_start.year,
+                                             datetime_start.month,
+                                             datetime_start.day))
+    struct.pack_into('d', header, 48, 1 / frequency)
+    struct.pack_into('d', header, 56, day_seconds.total_seconds())
+
+    samples_count = seconds * frequency
+    signal = rnd.normal(0, 1000, (samples_count, SEISMIC_CHANNELS_COUNT))
+    burst_count = max(seconds // 300, 1)
+    for position in rnd.randint(0, samples_count, burst_count):
+        width = min(frequency * 20, samples_count - position)
+        signal[position:position + width] *= rnd.uniform(3, 10)
+
+    with open(path, 'wb') as file_ctx:
+        file_ctx.write(bytes(header))
+        file_ctx.write(signal.astype(np.int32).tobytes())
+
+
+def write_coordinates_file(path: str, scale: SyntheticScale,
+                           rnd: np.random.RandomState):
+    with open(path, 'w') as file_ctx:
+        file_ctx.write('name,comment,x,y\n')
+        for i in range(scale.stations):
+            x_val, y_val = rnd.uniform(60, 70), rnd.uniform(70, 80)
+            file_ctx.write(f'{format_station(i)},,{x_val:.6f},{y_val:.6f}\n')
+
+
+def write_config_file(root: str) -> str:
+    config = json.loads(json.dumps(STRUCTURE))
+    config['geometry']['filepath'] = os.path.join(root, COORDINATES_FILENAME)
+    config['gravimetric']['root'] = os.path.join(root, 'gravimetric')
+    config['seismic']['root'] = os.path.join(root, 'seismic')
+    config['export']['root'] = os.path.join(root, 'project')
+
+    path = os.path.join(root, CONFIG_FILENAME)
+    with open(path, 'w') as file_ctx:
+        json.dump(config, file_ctx, indent=4)
+    return path
+
+
+def generate_project(root: str, scale: SyntheticScale, seed=0) -> str:
+    rnd = np.random.RandomState(seed)
+    for folder in ('gravimetric', 'seismic', 'project'):
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    for day in range(scale.days):
+        day_start = START_DATE + timedelta(days=day)
+        grav_folder = os.path.join(root, 'gravimetric',
+                                   day_start.strftime('%Y%m%d'))
+        os.makedirs(grav_folder, exist_ok=True)
+
+        sessions = create_sessions(scale, day)
+        write_chain_files(grav_folder, day_start, sessions, rnd)
+        for session in sessions:
+            write_dat_file(os.path.join(grav_folder,
+                                        get_dat_filename(session)),
+                           session, rnd)
+
+            margin = timedelta(minutes=SEISMIC_MARGIN_MINUTES)
+            seis_start = session.datetime_start - margin
+            seconds = (session.minutes + 2 * SEISMIC_MARGIN_MINUTES) * 60
+            filename = f'{session.link_index}_{session.station}_' \
+                       f'{SEISMOMETER_NUMBER}_' \
+                       f'{seis_start.strftime("%Y-%m-%d_%H-%M-%S")}.xx'
+            write_seismic_file(os.path.join(root, 'seismic', filename),
+                               seis_start, seconds, scale.seismic_frequency,
+                               rnd)
+
+        tsf_start = sessions[0].datetime_start - timedelta(minutes=10)
+        tsf_stop = sessions[-1].datetime_start + timedelta(
+            minutes=sessions[-1].minutes + 10)
+        tsf_name = f'{GRAVIMETER_NUMBER[-4:]}_' \
+                   f'{day_start.strftime("%Y%m%d")}.tsf'
+        write_tsf_file(os.path.join(grav_folder, tsf_name), tsf_start,
+                       tsf_stop, rnd)
+
+    write_coordinates_file(os.path.join(root, COORDINATES_FILENAME), scale,
+                           rnd)
+    return write_config_file(root)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Synthetic gravity-seismic project generator')
+    parser.add_argument('--root', required=True,
+                        help='folder for generated files')
+    parser.add_argument('--stations', type=int, default=4)
+    parser.add_argument('--days', type=int, default=1)
+    parser.add_argument('--frequency', type=int, default=250,
+                        help='seismic sampling frequency, Hz')
+    parser.add_argument('--session-minutes', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    scale_params = SyntheticScale(args.stations, args.days, args.frequency,
+                                  args.session_minutes)
+    print(generate_project(args.root, scale_params, args.seed))
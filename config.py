@@ -4,6 +4,15 @@ import logging
 from typing import List, NamedTuple, Tuple
 
 
+DEFAULT_BAND_NAME = 'default'
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_TAPER = 'none'
+DEFAULT_READ_BLOCK_SECONDS = 600
+DEFAULT_CACHE_SIZE_MB = 2048
+DEFAULT_SLOW_QUERY_SECONDS = 0.5
+DEFAULT_PLOT_WORKERS_COUNT = 1
+DEFAULT_VIEWER_CACHE_SIZE_MB = 512
+
 STRUCTURE = {
     'geometry': {
         'filepath': 'point_coords.csv',
@@ -29,8 +38,35 @@ STRUCTURE = {
         }
     },
     'processing': {
-        'f_min': 0.1,
-        'f_max': 10
+        'bands': [
+            {
+                'name': 'default',
+                'f_min': 0.1,
+                'f_max': 10
+            }
+        ],
+        'correction_band': 'default',
+        'window': {
+            'length': 60,
+            'hop': 60,
+            'taper': 'none'
+        },
+        'block_seconds': 600,
+        'resample_frequency': 0
+    },
+    'cache': {
+        'max_size_mb': 2048
+    },
+    'instrumentation': {
+        'cpu_profiling': False,
+        'memory_tracing': False,
+        'slow_query_seconds': 0.5
+    },
+    'plotting': {
+        'workers': 1
+    },
+    'viewer': {
+        'memory_cache_mb': 512
     },
     'export': {
         'root': 'path'
@@ -44,6 +80,18 @@ class SeismicFileAttr(NamedTuple):
     sensor: str
 
 
+class FrequencyBand(NamedTuple):
+    name: str
+    f_min: float
+    f_max: float
+
+
+class EnergyWindow(NamedTuple):
+    length: float
+    hop: float
+    taper: str
+
+
 class CoordinateColumnIndexes(NamedTuple):
     name: int
     x: int
@@ -113,6 +161,76 @@ class ConfigFile:
         sensor = split_name[sensor_index]
         return SeismicFileAttr(filename, point, sensor)
 
-    def get_bandpass_freqs(self) -> Tuple[float, float]:
+    @property
+    def frequency_bands(self) -> List[FrequencyBand]:
         params = self.data['processing']
-        return params['f_min'], params['f_max']
\ No newline at end of file
+        if 'bands' not in params:
+            return [FrequencyBand(DEFAULT_BAND_NAME, params['f_min'],
+                                  params['f_max'])]
+
+        bands = []
+        for band in params['bands']:
+            bands.append(
+                FrequencyBand(band['name'], band['f_min'], band['f_max']))
+        return bands
+
+    @property
+    def correction_band(self) -> FrequencyBand:
+        bands = self.frequency_bands
+        name = self.data['processing'].get('correction_band', bands[0].name)
+        for band in bands:
+            if band.name == name:
+                return band
+        logging.error(f'Frequency band {name} not found in configuration')
+        raise KeyError(name)
+
+    @property
+    def energy_window(self) -> EnergyWindow:
+        params = self.data['processing'].get('window', {})
+        length = params.get('length', DEFAULT_WINDOW_SECONDS)
+        hop = params.get('hop', length)
+        taper = params.get('taper', DEFAULT_TAPER)
+        return EnergyWindow(length, hop, taper)
+
+    @property
+    def read_block_seconds(self) -> int:
+        return self.data['processing'].get('block_seconds',
+                                           DEFAULT_READ_BLOCK_SECONDS)
+
+    @property
+    def resample_frequency(self) -> int:
+        return self.data['processing'].get('resample_frequency', 0)
+
+    @property
+    def signal_cache_size_mb(self) -> float:
+        return self.data.get('cache', {}).get('max_size_mb',
+                                              DEFAULT_CACHE_SIZE_MB)
+
+    @property
+    def is_cpu_profiling(self) -> bool:
+        return self.data.get('instrumentation', {}).get('cpu_profiling',
+                                                        False)
+
+    @property
+    def is_memory_tracing(self) -> bool:
+        return self.data.get('instrumentation', {}).get('memory_tracing',
+                                                        False)
+
+    @property
+    def slow_query_seconds(self) -> float:
+        return self.data.get('instrumentation', {}).get(
+            'slow_query_seconds', DEFAULT_SLOW_QUERY_SECONDS)
+
+    @property
+    def plot_workers_count(self) -> int:
+        return self.data.get('plotting', {}).get('workers',
+                                                 DEFAULT_PLOT_WORKERS_COUNT)
+
+    @property
+    def viewer_cache_size_mb(self) -> float:
+        return self.data.get('viewer', {}).get('memory_cache_mb',
+                                               DEFAULT_VIEWER_CACHE_SIZE_MB)
+
+    def get_bandpass_freqs(self) -> Tuple[float, float]:
+        band = self.correction_band
+        return band.f_min, band.f_max
\ No newline at end of file
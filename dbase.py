@@ -1,13 +1,43 @@
 import os
+import re
+import sys
+import time
 import sqlite3
+from urllib.request import pathname2url
 from datetime import datetime
 from datetime import timedelta
-from typing import Union, List, Tuple, Dict
+from functools import lru_cache
+from typing import Union, List, Tuple, Dict, Set, FrozenSet
 import logging
 
+import numpy as np
+
+from instrumentation import RUN_TRACKER, QUERY_CACHE_SIZE
+from instrumentation import get_query_statement
+
 
 DEFAULT_NAME = 'Project.db'
-DBASE_SCRIPT = 'dbase.sql'
+CONNECTION_TIMEOUT = 60
+DBASE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'dbase.sql')
+DEFAULT_SLOW_QUERY_SECONDS = 0.5
+QUERY_SOURCES_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)',
+                                   re.IGNORECASE)
+PLAN_QUERY_TYPES = ('SELECT', 'WITH')
+SECONDS_PER_DAY = 86400
+SCHEMA_VERSION = 2
+MIGRATION_COLUMNS = {
+    'seis_energy': [('band', 'VARCHAR(20) NOT NULL DEFAULT \'default\'')],
+    'median_energy': [('band', 'VARCHAR(20) NOT NULL DEFAULT \'default\'')],
+    'corrections': [('level_corr', 'REAL NOT NULL DEFAULT 0')]
+}
+
+SEIS_CORRECTION_TYPE = 'seis'
+LEVEL_CORRECTION_TYPE = 'level'
+CORRECTION_COLUMNS = {
+    SEIS_CORRECTION_TYPE: 'seis_corr',
+    LEVEL_CORRECTION_TYPE: 'level_corr'
+}
 
 
 def load_dbase_script(path) -> str:
@@ -15,106 +45,232 @@ def load_dbase_script(path) -> str:
         return file_ctx.read()
 
 
+def split_dbase_script(script_text: str) -> List[str]:
+    statements, lines = [], []
+    for line in script_text.splitlines():
+        lines.append(line)
+        statement = '\n'.join(lines).strip()
+        if statement and sqlite3.complete_statement(statement):
+            statements.append(statement)
+            lines = []
+    return statements
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def get_query_sources(statement: str) -> FrozenSet[str]:
+    return frozenset(QUERY_SOURCES_PATTERN.findall(statement))
+
+
+def get_relative_seconds_sql(column: str, origin_column: str) -> str:
+    return f'ROUND((JULIANDAY({column}) - JULIANDAY({origin_column})) * ' \
+           f'{SECONDS_PER_DAY}, 3)'
+
+
+def get_ids_sql(ids: List[int]) -> str:
+    return ', '.join((str(x) for x in ids))
+
+
 class SqliteDbase:
-    def __init__(self, root=''):
+    def __init__(self, root='',
+                 slow_query_seconds=DEFAULT_SLOW_QUERY_SECONDS,
+                 is_read_only=False):
         self.root = root
+        self.slow_query_seconds = slow_query_seconds
+        self.is_read_only = is_read_only
         self.logger = logging.getLogger('dbase')
         self.connection = self.create_connection()
+        self.views = self.__load_view_names()
 
     @property
     def path(self) -> str:
         return os.path.join(self.root, DEFAULT_NAME)
 
     def create_connection(self):
+        if self.is_read_only:
+            if not os.path.exists(self.path):
+                raise OSError(f'Database {self.path} not found')
+            uri = f'file:{pathname2url(os.path.abspath(self.path))}?mode=ro'
+            return sqlite3.connect(uri, timeout=CONNECTION_TIMEOUT, uri=True)
+
         if os.path.exists(self.path):
-            return sqlite3.connect(self.path)
+            connection = sqlite3.connect(self.path,
+                                         timeout=CONNECTION_TIMEOUT)
+            self.__migrate_schema(connection)
+            return connection
 
-        connection = sqlite3.connect(self.path)
+        connection = sqlite3.connect(self.path, timeout=CONNECTION_TIMEOUT)
         script_text = load_dbase_script(DBASE_SCRIPT)
         cursor = connection.cursor()
         cursor.executescript(script_text)
+        cursor.execute(f'PRAGMA user_version={SCHEMA_VERSION};')
         connection.commit()
         cursor.close()
         return connection
 
+    def __migrate_schema(self, connection: sqlite3.Connection):
+        cursor = connection.cursor()
+        cursor.execute('PRAGMA user_version;')
+        if cursor.fetchone()[0] >= SCHEMA_VERSION:
+            return
+
+        statements = split_dbase_script(load_dbase_script(DBASE_SCRIPT))
+        for statement in statements:
+            if statement.startswith('CREATE TABLE '):
+                cursor.execute(statement.replace(
+                    'CREATE TABLE ', 'CREATE TABLE IF NOT EXISTS ', 1))
+
+        for table, columns in MIGRATION_COLUMNS.items():
+            cursor.execute(f'PRAGMA table_info({table});')
+            names = {x[1] for x in cursor.fetchall()}
+            for name, definition in columns:
+                if name not in names:
+                    cursor.execute(
+                        f'ALTER TABLE {table} ADD COLUMN {name} '
+                        f'{definition};')
+
+        for statement in statements:
+            if statement.startswith('CREATE VIEW '):
+                cursor.execute(f'DROP VIEW IF EXISTS {statement.split()[2]};')
+                cursor.execute(statement)
+
+        cursor.execute(f'PRAGMA user_version={SCHEMA_VERSION};')
+        connection.commit()
+        cursor.close()
+        self.logger.info(f'Database {self.path} migrated to schema version '
+                         f'{SCHEMA_VERSION}')
+
+    def __load_view_names(self) -> Set[str]:
+        query = 'SELECT name FROM sqlite_master WHERE type=\'view\';'
+        cursor = self.connection.cursor()
+        cursor.execute(query)
+        return {x[0] for x in cursor.fetchall()}
+
+    def __run_query(self, query: str, fetch_mode: str,
+                    is_commit=False) -> Union[sqlite3.Cursor, tuple, list]:
+        time_start = time.perf_counter()
+        cursor = self.connection.cursor()
+        cursor.execute(query)
+        if fetch_mode == 'one':
+            result = cursor.fetchone()
+            rows = 0 if result is None else 1
+        elif fetch_mode == 'all':
+            result = cursor.fetchall()
+            rows = len(result)
+        else:
+            result = cursor
+            rows = max(cursor.rowcount, 0)
+        if is_commit:
+            self.connection.commit()
+        seconds = time.perf_counter() - time_start
+
+        if RUN_TRACKER.enabled:
+            method = self.__get_method_name()
+            views = get_query_sources(get_query_statement(query)) & \
+                self.views
+            RUN_TRACKER.add_query_timing(query, method, views, seconds, rows)
+            if fetch_mode == 'none' and rows and \
+                    query.lstrip()[:6].upper() == 'INSERT':
+                RUN_TRACKER.count('rows_inserted', rows)
+        if seconds >= self.slow_query_seconds:
+            self.__log_slow_query(query, self.__get_method_name(), seconds)
+        return result
+
+    def __get_method_name(self) -> str:
+        frame = sys._getframe(3)
+        while frame.f_code.co_name.startswith('__') and frame.f_back:
+            frame = frame.f_back
+        return frame.f_code.co_name
+
+    def __log_slow_query(self, query: str, method: str, seconds: float):
+        plan = []
+        if query.lstrip()[:6].upper().startswith(PLAN_QUERY_TYPES):
+            cursor = self.connection.cursor()
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}')
+            plan = [x[-1] for x in cursor.fetchall()]
+        RUN_TRACKER.add_slow_query(query, method, seconds, plan)
+        self.logger.warning('Slow query in %s (%.3f s): %s\nPlan:\n%s',
+                            method, seconds, query, '\n'.join(plan))
+
+    def execute(self, query: str, is_commit=False) -> sqlite3.Cursor:
+        return self.__run_query(query, 'none', is_commit)
+
+    def fetch_one(self, query: str) -> Union[tuple, None]:
+        return self.__run_query(query, 'one')
+
+    def fetch_all(self, query: str) -> List[tuple]:
+        return self.__run_query(query, 'all')
+
+    def enable_concurrent_access(self):
+        self.execute('PRAGMA journal_mode=WAL;', is_commit=True)
+
     def add_chain(self, sensor_part_name: str,
                   chain_path: str, cycle_path: str) -> int:
         query = 'INSERT INTO chains(dev_num_part, chain_path, cycle_path) ' \
                 f'VALUES (\'{sensor_part_name}\', \'{chain_path}\', ' \
                 f'\'{cycle_path}\');'
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query)
-            self.connection.commit()
-            self.logger.debug(
-                f'insert new chain with path {chain_path} successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('insert new chain with path %s successful',
+                              chain_path)
         except sqlite3.IntegrityError:
             self.logger.error(
                 f'insert new chain with path {chain_path} failed')
 
         query = f'SELECT id FROM chains WHERE chain_path=\'{chain_path}\''
-        id_val = cursor.execute(query).fetchone()[0]
-        self.logger.info(f'chain: path={chain_path} '
-                         f'sensor_part_name={sensor_part_name} id={id_val}')
+        id_val = self.fetch_one(query)[0]
+        self.logger.info('chain: path=%s sensor_part_name=%s id=%s',
+                         chain_path, sensor_part_name, id_val)
         return id_val
 
     def add_link(self, chain_id: int, link_index: int, filename: str) -> int:
         query = 'INSERT INTO links(chain_id, link_index, filename) VALUES ' \
                 f'({chain_id}, {link_index}, \'{filename}\');'
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query)
-            self.connection.commit()
-            self.logger.debug(f'insert new link {filename} successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('insert new link %s successful', filename)
         except sqlite3.IntegrityError:
             self.logger.error(f'insert new link {filename} failed')
 
         query = f'SELECT id FROM links ' \
                 f'WHERE filename=\'{filename}\' AND chain_id={chain_id};'
-        id_val = cursor.execute(query).fetchone()[0]
-        self.logger.info(f'link: filename={filename} order={link_index} '
-                         f'chain_id={chain_id} id={id_val}')
+        id_val = self.fetch_one(query)[0]
+        self.logger.info('link: filename=%s order=%s chain_id=%s id=%s',
+                         filename, link_index, chain_id, id_val)
         return id_val
 
     def add_gravimeter(self, number: str) -> int:
         query = f'INSERT INTO gravimeters(number) VALUES(\'{number}\');'
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query)
-            self.connection.commit()
-            self.logger.debug(f'insert new gravimeter with number {number} '
-                              'successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('insert new gravimeter with number %s '
+                              'successful', number)
         except sqlite3.IntegrityError:
             self.logger.error(f'insert new gravimeter with number {number} '
                               'failed')
 
         query = f'SELECT id FROM gravimeters WHERE number=\'{number}\';'
-        id_val = cursor.execute(query).fetchone()[0]
-        self.logger.info(f'gravimeter: number={number} id={id_val}')
+        id_val = self.fetch_one(query)[0]
+        self.logger.info('gravimeter: number=%s id=%s', number, id_val)
         return id_val
 
     def add_seismometer(self, number: str):
         query = f'INSERT INTO seismometers(number) VALUES(\'{number}\');'
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query)
-            self.connection.commit()
-            self.logger.debug(f'insert new seismometer with number {number} '
-                              'successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('insert new seismometer with number %s '
+                              'successful', number)
         except sqlite3.IntegrityError:
             self.logger.error(f'insert new seismometer with number {number} '
                               'failed')
 
         query = f'SELECT id FROM seismometers WHERE number=\'{number}\';'
-        id_val = cursor.execute(query).fetchone()[0]
-        self.logger.info(f'seismometer: number={number} id={id_val}')
+        id_val = self.fetch_one(query)[0]
+        self.logger.info('seismometer: number=%s id=%s', number, id_val)
         return id_val
 
     def add_station(self, name: str, x_wgs84=0., y_wgs84=0.) -> int:
-        cursor = self.connection.cursor()
         query = f'SELECT COUNT(1) FROM stations WHERE name=\'{name}\';'
-        cursor.execute(query)
-        record = cursor.fetchone()[0]
+        record = self.fetch_one(query)[0]
         if not record:
             query = f'INSERT INTO stations(name, xWGS84, yWGS84) ' \
                     f'VALUES(\'{name}\', {x_wgs84}, {y_wgs84});'
@@ -122,29 +278,26 @@ class SqliteDbase:
             query = f'UPDATE stations SET xWGS84={x_wgs84}, ' \
                     f'yWGS84={y_wgs84} WHERE name=\'{name}\';'
         try:
-            cursor.execute(query)
-            self.connection.commit()
-            self.logger.debug(f'insert/update new station with name {name} '
-                              'successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('insert/update new station with name %s '
+                              'successful', name)
         except sqlite3.IntegrityError:
             self.logger.error(f'insert/update new station with name {name} '
                               'failed')
 
         query = f'SELECT id FROM stations WHERE name=\'{name}\';'
-        id_val = cursor.execute(query).fetchone()[0]
-        self.logger.info(f'station: name={name} id={id_val}')
+        id_val = self.fetch_one(query)[0]
+        self.logger.info('station: name=%s id=%s', name, id_val)
         return id_val
 
     def change_link_status(self, grav_dat_filename: str, is_exist=True):
         query = f'UPDATE links SET is_exist={int(is_exist)} ' \
                 f'WHERE filename=\'{grav_dat_filename}\';'
-        cursor = self.connection.cursor()
         try:
-            cursor.execute(query)
-            self.connection.commit()
+            self.execute(query, is_commit=True)
             self.logger.debug(
-                f'status for link with filename={grav_dat_filename} changed '
-                f'to {is_exist}')
+                'status for link with filename=%s changed to %s',
+                grav_dat_filename, is_exist)
         except sqlite3.IntegrityError:
             self.logger.error(
                 f'status for link with filename={grav_dat_filename} '
@@ -152,9 +305,7 @@ class SqliteDbase:
 
     def get_id_grav_dat_file_by_path(self, path: str) -> Union[int, None]:
         query = f'SELECT id FROM grav_dat_files WHERE path=\'{path}\''
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        records = cursor.fetchone()
+        records = self.fetch_one(query)
         if not records:
             return None
         else:
@@ -172,9 +323,8 @@ class SqliteDbase:
                 f'({sensor_id}, {point_id}, \'{datetime_start}\', ' \
                 f'\'{datetime_stop}\', \'{filename}\',\'{path}\');'
         try:
-            self.connection.cursor().execute(query)
-            self.connection.commit()
-            self.logger.debug(f'DAT-file with path {path} added successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('DAT-file with path %s added successful', path)
         except sqlite3.IntegrityError:
             self.logger.error(f'DAT-file with path {path} not add to dbase')
 
@@ -185,12 +335,11 @@ class SqliteDbase:
                          'VALUES ({dat_file_id}, \'{datetime_val}\', ' \
                          '{corr_grav});'
 
-        cursor = self.connection.cursor()
         for datetime_val, corr_grav in measures:
             query = query_template.format(dat_file_id=dat_file_id,
                                           datetime_val=datetime_val,
                                           corr_grav=corr_grav)
-            cursor.execute(query)
+            self.execute(query)
         self.connection.commit()
 
     def add_grav_tsf_file(self, dev_num_part: str, datetime_start: datetime,
@@ -200,17 +349,14 @@ class SqliteDbase:
                 f'VALUES (\'{dev_num_part}\', \'{datetime_start}\', ' \
                 f'\'{datetime_stop}\', \'{path}\')'
         try:
-            self.connection.cursor().execute(query)
-            self.connection.commit()
-            self.logger.debug(f'TSF-file with path {path} added successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('TSF-file with path %s added successful', path)
         except sqlite3.IntegrityError:
             self.logger.error(f'TSF-file with path {path} not add')
 
     def get_id_grav_tsf_file_by_path(self, path: str) -> int:
         query = f'SELECT id FROM grav_tsf_files WHERE path=\'{path}\';'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return cursor.fetchone()[0]
+        return self.fetch_one(query)[0]
 
     def add_gravity_second_measures(self, tsf_file_id: int,
                                     measures: List[Tuple[int, int]]):
@@ -218,20 +364,17 @@ class SqliteDbase:
                          'grav_tsf_file_id, measure_index, src_value) ' \
                          'VALUES ({tsf_file_id}, \'{measure_index}\', ' \
                          '{src_value});'
-        cursor = self.connection.cursor()
         for measure_index, value in enumerate(measures):
             datetime_val, src_value = value
             query = query_template.format(tsf_file_id=tsf_file_id,
                                           measure_index=measure_index,
                                           src_value=src_value)
-            cursor.execute(query)
+            self.execute(query)
         self.connection.commit()
 
     def get_grav_defect_input_preparing(self) -> List[Tuple[int, int, str]]:
         query = 'SELECT * FROM grav_defect_input_preparing;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return cursor.fetchall()
+        return self.fetch_all(query)
 
     def update_grav_defect_marker(self, grav_dat_file_id: int,
                                   cycle_index: int, is_bad: bool):
@@ -242,7 +385,7 @@ class SqliteDbase:
                 f'(SELECT datetime_start FROM grav_dat_files ' \
                 f'WHERE id={grav_dat_file_id}))+ {cycle_index} * 60,' \
                 f'\'unixepoch\');'
-        self.connection.cursor().execute(query)
+        self.execute(query)
 
     def update_grav_defect_markers(self, grav_dat_file_id: int,
                                    markers: Dict[int, bool]):
@@ -266,31 +409,42 @@ class SqliteDbase:
                 f'\'{datetime_start_str}\', \'{datetime_stop_str}\', ' \
                 f'\'{path}\');'
         try:
-            self.connection.cursor().execute(query)
-            self.connection.commit()
-            self.logger.debug(f'seismic file with path {path} added '
-                              f'successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('seismic file with path %s added successful',
+                              path)
         except sqlite3.IntegrityError:
             self.logger.error(f'seismic file with path {path} not add')
 
         query = f'SELECT id FROM seis_files WHERE path=\'{path}\''
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        id_val = cursor.fetchone()[0]
+        id_val = self.fetch_one(query)[0]
 
         query = f'INSERT INTO seis_files_defect_info(seis_file_id) ' \
                 f'VALUES ({id_val});'
-        self.connection.cursor().execute(query)
-        self.connection.commit()
+        self.execute(query, is_commit=True)
+
+    def add_seis_channel_stats(self, path: str, mtime: float,
+                               component: str,
+                               stats: Tuple[float, float, float, float]):
+        mean_val, min_val, max_val, rms_val = stats
+        query = 'INSERT OR REPLACE INTO seis_channel_stats(path, mtime, ' \
+                'component, mean_val, min_val, max_val, rms_val) ' \
+                f'VALUES (\'{path}\', {mtime}, \'{component}\', ' \
+                f'{mean_val}, {min_val}, {max_val}, {rms_val});'
+        self.execute(query, is_commit=True)
+
+    def get_seis_channel_stats(
+            self, path: str,
+            mtime: float) -> Dict[str, Tuple[float, float, float, float]]:
+        query = 'SELECT component, mean_val, min_val, max_val, rms_val ' \
+                f'FROM seis_channel_stats WHERE path=\'{path}\' AND ' \
+                f'mtime={mtime};'
+        return {x[0]: tuple(x[1:]) for x in self.fetch_all(query)}
 
     def get_seismic_files_for_checking(self) -> List[Tuple[int, str,
                                                            List[str]]]:
         query = 'SELECT * FROM need_check_seis_files;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-
         records = []
-        for rec in cursor.fetchall():
+        for rec in self.fetch_all(query):
             file_id, path, x_channel, y_channel, z_channel = rec
             components = []
             if x_channel == 'Unknown':
@@ -308,28 +462,27 @@ class SqliteDbase:
                                          conclusion: str):
         if component.upper() == 'X':
             query = f'UPDATE seis_files_defect_info ' \
-                    f'SET x_channel=\'{conclusion}\' WHERE seis_id={file_id};'
+                    f'SET x_channel=\'{conclusion}\' ' \
+                    f'WHERE seis_file_id={file_id};'
         elif component.upper() == 'Y':
             query = f'UPDATE seis_files_defect_info ' \
-                    f'SET y_channel=\'{conclusion}\' WHERE seis_id={file_id};'
+                    f'SET y_channel=\'{conclusion}\' ' \
+                    f'WHERE seis_file_id={file_id};'
         elif component.upper() == 'Z':
             query = f'UPDATE seis_files_defect_info ' \
-                    f'SET z_channel=\'{conclusion}\' WHERE seis_id={file_id};'
+                    f'SET z_channel=\'{conclusion}\' ' \
+                    f'WHERE seis_file_id={file_id};'
         else:
             return
-        self.connection.cursor().execute(query)
-        self.connection.commit()
+        self.execute(query, is_commit=True)
 
     def clear_measure_pairs(self):
         query = 'DELETE FROM measure_pairs;'
-        self.connection.cursor().execute(query)
-        self.connection.commit()
+        self.execute(query, is_commit=True)
 
     def get_grav_seis_pairs(self):
         query = 'SELECT * FROM grav_seis_pairs;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        src_data = [list(x) for x in cursor.fetchall()]
+        src_data = [list(x) for x in self.fetch_all(query)]
 
         records = []
         for rec in src_data:
@@ -348,18 +501,28 @@ class SqliteDbase:
                 f'{grav_dat_id}, {seis_id}, \'{datetime_left}\', ' \
                 f'\'{datetime_right}\');'
         try:
-            self.connection.cursor().execute(query)
-            self.connection.commit()
-            self.logger.debug(f'Time intersection added successful')
+            self.execute(query, is_commit=True)
+            self.logger.debug('Time intersection added successful')
         except sqlite3.IntegrityError:
             self.logger.error(f'Fail adding time intersection')
 
     def get_measure_pairs(self) -> List[Tuple[int, int, int, datetime,
                                               datetime]]:
         query = 'SELECT * FROM measure_pairs;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        src_data = [list(x) for x in cursor.fetchall()]
+        return self.__get_measure_pair_records(query)
+
+    def get_measure_pairs_by_chain_id(
+            self, chain_id: int) -> List[Tuple[int, int, int, datetime,
+                                               datetime]]:
+        query = 'SELECT DISTINCT mp.* FROM measure_pairs AS mp ' \
+                'JOIN sensor_pairs AS sp ON sp.measure_pair_id=mp.id ' \
+                f'WHERE sp.chain_id={chain_id} ORDER BY mp.id;'
+        return self.__get_measure_pair_records(query)
+
+    def __get_measure_pair_records(
+            self, query: str) -> List[Tuple[int, int, int, datetime,
+                                            datetime]]:
+        src_data = [list(x) for x in self.fetch_all(query)]
 
         records = []
         for rec in src_data:
@@ -372,101 +535,161 @@ class SqliteDbase:
 
     def delete_all_energies(self):
         query = 'DELETE FROM seis_energy;'
-        self.connection.cursor().execute(query)
+        self.execute(query)
 
         query = 'DELETE FROM median_energy;'
-        self.connection.cursor().execute(query)
+        self.execute(query)
+
+        query = 'DELETE FROM energy_checkpoints;'
+        self.execute(query)
 
         self.connection.commit()
 
+    def delete_incomplete_energies(self):
+        query = 'DELETE FROM seis_energy WHERE measure_pair_id NOT IN (' \
+                'SELECT measure_pair_id FROM energy_checkpoints);'
+        self.execute(query)
+
+        query = 'DELETE FROM median_energy WHERE measure_pair_id NOT IN (' \
+                'SELECT measure_pair_id FROM energy_checkpoints);'
+        self.execute(query)
+
+        self.connection.commit()
+
+    def get_completed_measure_pair_ids(self) -> Set[int]:
+        query = 'SELECT measure_pair_id FROM energy_checkpoints ' \
+                'WHERE status=\'Done\';'
+        return {x[0] for x in self.fetch_all(query)}
+
+    def add_energy_checkpoint(self, measure_pair_id: int, is_commit=True):
+        query = 'INSERT OR REPLACE INTO energy_checkpoints(' \
+                f'measure_pair_id) VALUES ({measure_pair_id});'
+        self.execute(query)
+        if is_commit:
+            self.connection.commit()
+
+    def get_plot_fingerprints(self) -> Dict[int, str]:
+        query = 'SELECT measure_pair_id, fingerprint FROM plot_fingerprints;'
+        return {x[0]: x[1] for x in self.fetch_all(query)}
+
+    def add_plot_fingerprints(self, fingerprints: Dict[int, str]):
+        for measure_pair_id, fingerprint in fingerprints.items():
+            query = 'INSERT OR REPLACE INTO plot_fingerprints(' \
+                    'measure_pair_id, fingerprint) VALUES (' \
+                    f'{measure_pair_id}, \'{fingerprint}\');'
+            self.execute(query)
+        self.connection.commit()
+
+    def save_pair_energies(self, measure_pair_id: int,
+                           energies: Dict[str, List[List[float]]],
+                           median_energies: Dict[str, List[float]]):
+        try:
+            for band, band_energies in energies.items():
+                self.add_energies(measure_pair_id, band, band_energies,
+                                  is_commit=False)
+            for band, band_medians in median_energies.items():
+                self.add_median_energies(measure_pair_id, band, band_medians,
+                                         is_commit=False)
+            self.add_energy_checkpoint(measure_pair_id, is_commit=False)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            self.logger.error(f'energies for measure pair {measure_pair_id} '
+                              'not saved')
+            raise
+
     def get_seis_file_path_by_id(self, id_val: int) -> Union[str, None]:
         query = f'SELECT path from seis_files WHERE id={id_val}'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        record = cursor.fetchone()
+        record = self.fetch_one(query)
         if not record:
             self.logger.error(f'Seismic file with id={id_val} not found')
             return None
         else:
-            self.logger.info(f'Seismic file: id={id_val} path={record[0]}')
+            self.logger.info('Seismic file: id=%s path=%s', id_val,
+                             record[0])
             return record[0]
 
-    def add_energies(self, measure_pair_id: int, energies: List[List[float]]):
-        query_template = 'INSERT INTO seis_energy(measure_pair_id, ' \
+    def add_energies(self, measure_pair_id: int, band: str,
+                     energies: List[List[float]], is_commit=True):
+        query_template = 'INSERT INTO seis_energy(measure_pair_id, band, ' \
                          'minute_index, Ex, Ey, Ez, Efull) ' \
-                         'VALUES ({measure_pair_id}, {minute_index}, ' \
-                         '{e_x}, {e_y}, {e_z}, {e_f});'
-        cursor = self.connection.cursor()
+                         'VALUES ({measure_pair_id}, \'{band}\', ' \
+                         '{minute_index}, {e_x}, {e_y}, {e_z}, {e_f});'
         for index, energy_xyzf in enumerate(energies):
             query = query_template.format(
-                measure_pair_id=measure_pair_id,
+                measure_pair_id=measure_pair_id, band=band,
                 minute_index=index, e_x=energy_xyzf[0], e_y=energy_xyzf[1],
                 e_z=energy_xyzf[2], e_f=energy_xyzf[3])
-            cursor.execute(query)
-        self.connection.commit()
+            self.execute(query)
+        if is_commit:
+            self.connection.commit()
 
-    def add_median_energies(self, measure_pair_id: int,
-                            energies: List[float]):
+    def add_median_energies(self, measure_pair_id: int, band: str,
+                            energies: List[float], is_commit=True):
         query_template = 'INSERT INTO median_energy(measure_pair_id, ' \
-                         'Ex, Ey, Ez, Efull) ' \
-                         'VALUES ({measure_pair_id}, ' \
+                         'band, Ex, Ey, Ez, Efull) ' \
+                         'VALUES ({measure_pair_id}, \'{band}\', ' \
                          '{e_x}, {e_y}, {e_z}, {e_f});'
-        cursor = self.connection.cursor()
         query = query_template.format(
-            measure_pair_id=measure_pair_id,
+            measure_pair_id=measure_pair_id, band=band,
             e_x=energies[0], e_y=energies[1], e_z=energies[2],
             e_f=energies[3])
-        cursor.execute(query)
-        self.connection.commit()
+        self.execute(query)
+        if is_commit:
+            self.connection.commit()
 
     def get_pre_correction_data(
-            self) -> List[Tuple[int, float, float]]:
-        query = 'SELECT * FROM pre_correction;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return cursor.fetchall()
-
-    def clear_corrections(self):
-        query = 'DELETE FROM corrections;'
-        self.connection.cursor().execute(query)
-        self.connection.commit()
+            self, band: str, measure_pair_ids: List[int] = None
+    ) -> List[Tuple[int, int, float, float, float]]:
+        query = 'SELECT measure_pair_id, grav_measure_id, ' \
+                'quite_grav_level, corr_grav, Rz ' \
+                f'FROM pre_correction WHERE band=\'{band}\''
+        if measure_pair_ids is not None:
+            ids_str = ', '.join((str(x) for x in measure_pair_ids))
+            query += f' AND measure_pair_id IN ({ids_str})'
+        query += ';'
+        return self.fetch_all(query)
+
+    def clear_corrections(self, measure_pair_ids: List[int] = None):
+        query = 'DELETE FROM corrections'
+        if measure_pair_ids is not None:
+            ids_str = ', '.join((str(x) for x in measure_pair_ids))
+            query += f' WHERE measure_pair_id IN ({ids_str})'
+        query += ';'
+        self.execute(query, is_commit=True)
 
     def add_single_correction(self, measure_pair_id: int,
-                              grav_measure_id: int, seis_correction: float):
+                              grav_measure_id: int, seis_correction: float,
+                              level_correction: float):
         query = 'INSERT INTO corrections(measure_pair_id, ' \
-                'grav_measure_id, seis_corr) VALUES (' \
-                f'{measure_pair_id}, {grav_measure_id}, {seis_correction});'
-        self.connection.cursor().execute(query)
-
-    def add_seis_corrections(self, measure_pair_id: int,
-                             corrections: List[Tuple[int, float]]):
-        for grav_measure_id, correction_val in corrections:
+                'grav_measure_id, seis_corr, level_corr) VALUES (' \
+                f'{measure_pair_id}, {grav_measure_id}, {seis_correction}, ' \
+                f'{level_correction});'
+        self.execute(query)
+
+    def add_corrections(self, measure_pair_id: int,
+                        corrections: List[Tuple[int, float, float]]):
+        for grav_measure_id, seis_val, level_val in corrections:
             self.add_single_correction(measure_pair_id, grav_measure_id,
-                                       correction_val)
+                                       seis_val, level_val)
         self.connection.commit()
 
     def get_all_chain_ids(self) -> List[int]:
         query = 'SELECT id FROM chains;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        ids_list = [x[0] for x in cursor.fetchall()]
+        ids_list = [x[0] for x in self.fetch_all(query)]
         return ids_list
 
     def get_links_by_chain_id(self, chain_id: int) -> List[int]:
         query = f'SELECT id FROM links WHERE chain_id={chain_id} ' \
                 f'ORDER BY link_index ASC;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        records = cursor.fetchall()
+        records = self.fetch_all(query)
         return [x[0] for x in records]
 
     def get_device_pairs_by_chain_id(
             self, chain_id: int) -> List[Tuple[int, int]]:
         query = 'SELECT DISTINCT gravimeter_id, seismometer_id ' \
                 f'FROM sensor_pairs WHERE chain_id={chain_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        records = cursor.fetchall()
+        records = self.fetch_all(query)
         if not records:
             return []
         return records
@@ -478,9 +701,7 @@ class SqliteDbase:
                 f'chain_id={chain_id} AND link_id={link_id} AND ' \
                 f'gravimeter_id={gravimeter_id} AND ' \
                 f'seismometer_id={seismometer_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        if cursor.fetchone()[0]:
+        if self.fetch_one(query)[0]:
             return True
         return False
 
@@ -489,21 +710,19 @@ class SqliteDbase:
                 'WHERE grav_dat_file_id=(SELECT id FROM grav_dat_files ' \
                 'WHERE filename=(SELECT filename FROM links WHERE ' \
                 f'id={link_id}));'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return [x[0] for x in cursor.fetchall()]
+        return [x[0] for x in self.fetch_all(query)]
 
     def get_link_index(self, chain_id: int, link_id: int) -> int:
         query = 'SELECT link_index FROM links ' \
                 f'WHERE links.chain_id={chain_id} AND links.id={link_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return cursor.fetchone()[0]
+        return self.fetch_one(query)[0]
 
     def get_post_corrections_by_params(
             self, chain_id: int, link_id: int, gravimeter_id: int,
-            seismometer_id: int) -> List[tuple]:
-        query = 'SELECT cycle_index, is_bad, seis_corr ' \
+            seismometer_id: int,
+            correction_type=SEIS_CORRECTION_TYPE) -> List[tuple]:
+        column = CORRECTION_COLUMNS[correction_type]
+        query = f'SELECT cycle_index, is_bad, {column} ' \
                 'FROM post_correction ' \
                 f'WHERE chain_id={chain_id} AND link_id={link_id} AND ' \
                 f'measure_pair_id=(SELECT measure_pair_id FROM ' \
@@ -511,9 +730,7 @@ class SqliteDbase:
                 f'sp.link_id={link_id} AND ' \
                 f'sp.seismometer_id={seismometer_id} AND ' \
                 f'sp.gravimeter_id={gravimeter_id}) ORDER BY cycle_index;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        records = cursor.fetchall()
+        records = self.fetch_all(query)
         return records
 
     def is_chain_has_corrections(
@@ -523,41 +740,31 @@ class SqliteDbase:
                 f'sp.chain_id={chain_id} AND ' \
                 f'sp.gravimeter_id={gravimeter_id} AND ' \
                 f'sp.seismometer_id={seismometer_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return True if cursor.fetchone()[0] else False
+        return True if self.fetch_one(query)[0] else False
 
     def get_correction_filename(self, chain_id: int) -> str:
         query = f'SELECT cycle_path FROM chains WHERE id={chain_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        filename = os.path.basename(cursor.fetchone()[0])
+        filename = os.path.basename(self.fetch_one(query)[0])
         return filename
 
     def get_chain_datetime_by_id(self, chain_id: int) -> datetime:
         query = 'SELECT MIN(datetime_start) FROM grav_dat_files as df ' \
                 'WHERE filename=(SELECT filename FROM links ' \
                 f'WHERE chain_id={chain_id});'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        datetime_str = cursor.fetchone()[0]
+        datetime_str = self.fetch_one(query)[0]
         return datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
 
     def get_gravimeter_short_number_by_id(self, gravimeter_id: int) -> str:
         query = f'SELECT number FROM gravimeters WHERE id={gravimeter_id};'
 
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        short_number = str(int(cursor.fetchone()[0]))
+        short_number = str(int(self.fetch_one(query)[0]))
         return short_number
 
     def get_seismometer_number_by_id(self, seismometer_id: int) -> str:
         query = 'SELECT number FROM seismometers AS s ' \
                 f'WHERE s.id={seismometer_id};'
 
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        number = cursor.fetchone()[0]
+        number = self.fetch_one(query)[0]
         return number
 
     def get_chain_ids_by_stations(self, stations: List[str]) -> List[int]:
@@ -567,155 +774,162 @@ class SqliteDbase:
                 'JOIN links AS l ON l.id=df.link_id' \
                 'WHERE df.station_id IN (SELECT id FROM stations as s ' \
                 f'WHERE name IN ({stations_str})) ORDER BY chain_id ASC;'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        records = cursor.fetchall()
+        records = self.fetch_all(query)
         return [x[0] for x in records]
 
-    def get_grav_minute_measures(
-            self, measure_pair_id: int) -> List[Tuple[datetime, float, bool]]:
-        cursor = self.connection.cursor()
-
-        query = 'SELECT datetime_val, corr_grav, is_bad ' \
-                'FROM gravity_measures_minutes ' \
-                'WHERE grav_dat_file_id=(' \
-                '   SELECT grav_dat_file_id ' \
-                f'   FROM measure_pairs WHERE id={measure_pair_id});'
-
-        cursor.execute(query)
-        result = []
-        for rec in cursor.fetchall():
-            dt_val = datetime.strptime(rec[0], '%Y-%m-%d %H:%M:%S')
-            is_bad = True if rec[2] else False
-            result.append((dt_val, rec[1], is_bad))
-        return result
-
-    def get_seis_corrections(self, measure_pair_id: int) -> List[float]:
-        cursor = self.connection.cursor()
-
-        query = 'SELECT id ' \
-                'FROM gravity_measures_minutes ' \
-                'WHERE grav_dat_file_id=(' \
-                '   SELECT grav_dat_file_id ' \
-                '   FROM measure_pairs' \
-                f'  WHERE id={measure_pair_id});'
-        cursor.execute(query)
-        result = dict()
-        for rec in cursor.fetchall():
-            id_val = rec[0]
-            result[id_val] = 0
-
-        query = 'SELECT grav_measure_id, seis_corr ' \
-                'FROM corrections ' \
-                f'WHERE measure_pair_id={measure_pair_id};'
-        cursor.execute(query)
-        for rec in cursor.fetchall():
-            id_val, corr_val = rec
-            result[id_val] = corr_val
-
-        return [x[1] for x in
-                sorted(list(result.items()), key=lambda x: x[0])]
-
-    def get_grav_level(self, measure_pair_id: int) -> Union[float, None]:
-        cursor = self.connection.cursor()
-
+    def get_grav_level(self, measure_pair_id: int,
+                       band: str) -> Union[float, None]:
         query = 'SELECT quite_grav_level ' \
                 'FROM grav_level ' \
-                f'WHERE measure_pair_id={measure_pair_id};'
-        cursor.execute(query)
-        record = cursor.fetchone()
+                f'WHERE measure_pair_id={measure_pair_id} AND ' \
+                f'band=\'{band}\';'
+        record = self.fetch_one(query)
         if not record:
             return None
         return record[0]
 
-    def get_seis_energy(self,
-                        measure_pair_id: int) -> List[Tuple[datetime, float]]:
-        cursor = self.connection.cursor()
-
-        query = 'SELECT datetime_start ' \
-                'FROM measure_pairs ' \
-                f'WHERE id={measure_pair_id};'
-        cursor.execute(query)
-
-        datetime_start = datetime.strptime(cursor.fetchone()[0],
-                                           '%Y-%m-%d %H:%M:%S')
-
-        query = 'SELECT minute_index, Ez ' \
-                'FROM seis_energy ' \
-                f'WHERE measure_pair_id={measure_pair_id} ' \
-                'ORDER BY minute_index ASC;'
-        cursor.execute(query)
-
-        energy_vals = []
-        for minute_index, e_z in cursor.fetchall():
-            datetime_val = datetime_start + timedelta(
-                minutes=minute_index + 1)
-            energy_vals.append((datetime_val, e_z))
-        return energy_vals
-
-    def get_seis_level(self, measure_pair_id: int) -> float:
-        cursor = self.connection.cursor()
-
+    def get_seis_level(self, measure_pair_id: int, band: str) -> float:
         query = 'SELECT Ez ' \
                 'FROM minimal_energy ' \
-                f'WHERE measure_pair_id={measure_pair_id};'
-        cursor.execute(query)
-        return cursor.fetchone()[0]
+                f'WHERE measure_pair_id={measure_pair_id} AND ' \
+                f'band=\'{band}\';'
+        return self.fetch_one(query)[0]
 
     def get_tsf_file_path(self, measure_pair_id: int) -> str:
-        cursor = self.connection.cursor()
-
         query = 'SELECT gtf.path ' \
                 'FROM grav_tsf_files AS gtf ' \
                 'JOIN gravimeters AS g ON SUBSTR(g.number, -4)=gtf.dev_num_part ' \
                 'JOIN grav_dat_files AS gdf ON gtf.datetime_start < gdf.datetime_start AND gdf.datetime_stop <= gtf.datetime_stop AND gdf.gravimeter_id=g.id ' \
                 'JOIN measure_pairs AS mp ON mp.grav_dat_file_id=gdf.id ' \
                 f'WHERE mp.id={measure_pair_id};'
-        cursor.execute(query)
-        return cursor.fetchone()[0]
+        return self.fetch_one(query)[0]
 
     def get_seis_file_path(self, measure_pair_id: int) -> str:
-        cursor = self.connection.cursor()
-
         query = 'SELECT sf.path ' \
                 'FROM measure_pairs AS mp ' \
                 'JOIN seis_files AS sf ON sf.id=mp.seis_file_id ' \
                 f'WHERE mp.id={measure_pair_id};'
-        cursor.execute(query)
-        return cursor.fetchone()[0]
-
-    def get_quite_minute_start(self, measure_pair_id: int) -> datetime:
-        cursor = self.connection.cursor()
+        return self.fetch_one(query)[0]
 
+    def get_quite_minute_start(self, measure_pair_id: int,
+                               band: str) -> datetime:
         query = 'SELECT minute_index ' \
                 'FROM minimal_energy ' \
-                f'WHERE measure_pair_id={measure_pair_id};'
-        cursor.execute(query)
-        minute_index = cursor.fetchone()[0]
+                f'WHERE measure_pair_id={measure_pair_id} AND ' \
+                f'band=\'{band}\';'
+        minute_index = self.fetch_one(query)[0]
 
         query = 'SELECT datetime_start ' \
                 'FROM measure_pairs ' \
                 f'WHERE id={measure_pair_id};'
-        cursor.execute(query)
-        datetime_val = datetime.strptime(cursor.fetchone()[0],
+        datetime_val = datetime.strptime(self.fetch_one(query)[0],
                                          '%Y-%m-%d %H:%M:%S')
         return datetime_val + timedelta(minutes=minute_index)
 
+    def get_plot_pairs_info(
+            self, measure_pair_ids: List[int]
+    ) -> List[Tuple[int, Tuple[str, str, str, str], datetime, datetime,
+                    str, Union[str, None]]]:
+        query = 'SELECT mp.id, st.name, g.number, s.number, ' \
+                'sf.datetime_start, mp.datetime_start, mp.datetime_stop, ' \
+                'sf.path, gtf.path ' \
+                'FROM measure_pairs AS mp ' \
+                'JOIN seis_files AS sf ON sf.id=mp.seis_file_id ' \
+                'JOIN seismometers AS s ON s.id=sf.sensor_id ' \
+                'JOIN stations AS st ON st.id=sf.station_id ' \
+                'JOIN grav_dat_files AS gdf ON gdf.id=mp.grav_dat_file_id ' \
+                'JOIN gravimeters AS g ON g.id=gdf.gravimeter_id ' \
+                'LEFT JOIN grav_tsf_files AS gtf ' \
+                'ON gtf.dev_num_part=SUBSTR(g.number, -4) AND ' \
+                'gtf.datetime_start < gdf.datetime_start AND ' \
+                'gdf.datetime_stop <= gtf.datetime_stop ' \
+                f'WHERE mp.id IN ({get_ids_sql(measure_pair_ids)}) ' \
+                'ORDER BY mp.id ASC;'
+
+        result = []
+        for rec in self.fetch_all(query):
+            if result and result[-1][0] == rec[0]:
+                continue
+            seis_datetime = datetime.strptime(rec[4], '%Y-%m-%d %H:%M:%S')
+            info = (rec[1], str(int(rec[2])), rec[3],
+                    seis_datetime.strftime('%d.%m.%Y'))
+            datetime_start, datetime_stop = [
+                datetime.strptime(x, '%Y-%m-%d %H:%M:%S') for x in rec[5:7]]
+            result.append((rec[0], info, datetime_start, datetime_stop,
+                           rec[7], rec[8]))
+        return result
+
+    def get_measure_pair_groups(
+            self) -> List[Tuple[int, str, str, datetime, datetime]]:
+        query = 'SELECT mp.id, st.name, DATE(mp.datetime_start), ' \
+                'mp.datetime_start, mp.datetime_stop ' \
+                'FROM measure_pairs AS mp ' \
+                'JOIN seis_files AS sf ON sf.id=mp.seis_file_id ' \
+                'JOIN stations AS st ON st.id=sf.station_id ' \
+                'ORDER BY st.name ASC, DATE(mp.datetime_start) ASC, ' \
+                'mp.datetime_start ASC;'
+        result = []
+        for rec in self.fetch_all(query):
+            datetime_start, datetime_stop = [
+                datetime.strptime(x, '%Y-%m-%d %H:%M:%S') for x in rec[3:]]
+            result.append((rec[0], rec[1], rec[2], datetime_start,
+                           datetime_stop))
+        return result
+
+    def get_grav_levels(self, measure_pair_ids: List[int],
+                        band: str) -> Dict[int, float]:
+        query = 'SELECT measure_pair_id, quite_grav_level ' \
+                'FROM grav_level ' \
+                f'WHERE band=\'{band}\' AND ' \
+                f'measure_pair_id IN ({get_ids_sql(measure_pair_ids)});'
+        return {x[0]: x[1] for x in self.fetch_all(query)}
+
+    def get_minimal_energies(self, measure_pair_ids: List[int],
+                             band: str) -> Dict[int, Tuple[float, int]]:
+        query = 'SELECT measure_pair_id, Ez, minute_index ' \
+                'FROM minimal_energy ' \
+                f'WHERE band=\'{band}\' AND ' \
+                f'measure_pair_id IN ({get_ids_sql(measure_pair_ids)});'
+        return {x[0]: (x[1], x[2]) for x in self.fetch_all(query)}
+
+    def get_grav_minute_records(
+            self, measure_pair_ids: List[int],
+            correction_type=SEIS_CORRECTION_TYPE) -> np.ndarray:
+        column = CORRECTION_COLUMNS[correction_type]
+        seconds_sql = get_relative_seconds_sql('gmm.datetime_val',
+                                               'mp.datetime_start')
+        query = f'SELECT mp.id, {seconds_sql}, gmm.corr_grav, ' \
+                f'gmm.is_bad, COALESCE(c.{column}, 0) ' \
+                'FROM measure_pairs AS mp ' \
+                'JOIN gravity_measures_minutes AS gmm ' \
+                'ON gmm.grav_dat_file_id=mp.grav_dat_file_id ' \
+                'LEFT JOIN corrections AS c ' \
+                'ON c.grav_measure_id=gmm.id AND c.measure_pair_id=mp.id ' \
+                f'WHERE mp.id IN ({get_ids_sql(measure_pair_ids)}) ' \
+                'ORDER BY mp.id ASC, gmm.id ASC;'
+        return np.array(self.fetch_all(query),
+                        dtype=np.float64).reshape(-1, 5)
+
+    def get_seis_energy_records(self, measure_pair_ids: List[int],
+                                band: str) -> np.ndarray:
+        query = 'SELECT measure_pair_id, (minute_index + 1) * 60, Ez ' \
+                'FROM seis_energy ' \
+                f'WHERE band=\'{band}\' AND ' \
+                f'measure_pair_id IN ({get_ids_sql(measure_pair_ids)}) ' \
+                'ORDER BY measure_pair_id ASC, minute_index ASC;'
+        return np.array(self.fetch_all(query),
+                        dtype=np.float64).reshape(-1, 3)
+
     def get_start_datetime_intersection_info_by_id(
             self, id_val: int) -> datetime:
         query = 'SELECT datetime_start FROM time_intersection ' \
                 f'WHERE id={id_val};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-
-        record = cursor.fetchone()[0]
+        record = self.fetch_one(query)[0]
         return datetime.strptime(record, '%Y-%m-%d %H:%M:%S')
 
     def get_tsf_file_path_by_id(self, id_val: int) -> str:
         query = f'SELECT path FROM tsf_files WHERE id={id_val};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        return cursor.fetchone()[0]
+        return self.fetch_one(query)[0]
 
     def get_sensor_pair_info(self, measure_pair_id: int) -> Tuple[str, str,
                                                                   str, str]:
@@ -727,9 +941,7 @@ class SqliteDbase:
                 'JOIN grav_dat_files AS gdf ON gdf.id=mp.grav_dat_file_id ' \
                 'JOIN gravimeters AS g ON g.id=gdf.gravimeter_id ' \
                 f'WHERE mp.id={measure_pair_id};'
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        record = list(cursor.fetchone())
+        record = list(self.fetch_one(query))
         record[1] = str(int(record[1]))
 
         datetime_val = datetime.strptime(record[3], '%Y-%m-%d %H:%M:%S')
@@ -73,6 +73,18 @@ CREATE TABLE seis_files(
     FOREIGN KEY(station_id) REFERENCES stations(id)
 );
 
+CREATE TABLE seis_channel_stats(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    component VARCHAR(1) NOT NULL,
+    mean_val REAL NOT NULL DEFAULT 0,
+    min_val REAL NOT NULL DEFAULT 0,
+    max_val REAL NOT NULL DEFAULT 0,
+    rms_val REAL NOT NULL DEFAULT 0,
+    UNIQUE(path, component)
+);
+
 CREATE TABLE seis_files_defect_info(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     seis_file_id INTEGER NOT NULL,
@@ -95,6 +107,7 @@ CREATE TABLE measure_pairs(
 CREATE TABLE seis_energy(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     measure_pair_id INTEGER NOT NULL,
+    band VARCHAR(20) NOT NULL DEFAULT 'default',
     minute_index INTEGER NOT NULL,
     Ex REAL NOT NULL DEFAULT 0,
     Ey REAL NOT NULL DEFAULT 0,
@@ -106,6 +119,7 @@ CREATE TABLE seis_energy(
 CREATE TABLE median_energy(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     measure_pair_id INTEGER NOT NULL,
+    band VARCHAR(20) NOT NULL DEFAULT 'default',
     Ex REAL NOT NULL DEFAULT 0,
     Ey REAL NOT NULL DEFAULT 0,
     Ez REAL NOT NULL DEFAULT 0,
@@ -113,15 +127,30 @@ CREATE TABLE median_energy(
     FOREIGN KEY (measure_pair_id) REFERENCES measure_pairs(id) ON DELETE CASCADE
 );
 
+CREATE TABLE energy_checkpoints(
+    measure_pair_id INTEGER PRIMARY KEY NOT NULL,
+    status VARCHAR(10) CHECK(status IN ('Done')) DEFAULT 'Done',
+    datetime_val DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (measure_pair_id) REFERENCES measure_pairs(id) ON DELETE CASCADE
+);
+
 CREATE TABLE corrections(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     measure_pair_id INTEGER NOT NULL,
     grav_measure_id INTEGER NOT NULL,
     seis_corr REAL NOT NULL DEFAULT 0,
+    level_corr REAL NOT NULL DEFAULT 0,
     FOREIGN KEY (measure_pair_id) REFERENCES measure_pairs(id) ON DELETE CASCADE
     FOREIGN KEY (grav_measure_id) REFERENCES gravity_measures_minutes(id) ON DELETE CASCADE
 );
 
+CREATE TABLE plot_fingerprints(
+    measure_pair_id INTEGER PRIMARY KEY NOT NULL,
+    fingerprint VARCHAR(40) NOT NULL,
+    datetime_val DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (measure_pair_id) REFERENCES measure_pairs(id) ON DELETE CASCADE
+);
+
 
 CREATE VIEW need_check_seis_files
 AS
@@ -169,36 +198,36 @@ WHERE g.filename NOT IN (
 
 CREATE VIEW minimal_energy
 AS
-SELECT measure_pair_id, minute_index, MIN(Ez) AS Ez
+SELECT measure_pair_id, band, minute_index, MIN(Ez) AS Ez
 FROM seis_energy se
-GROUP BY measure_pair_id;
+GROUP BY measure_pair_id, band;
 
 CREATE VIEW energy_ratio
 AS
-SELECT se.measure_pair_id, se.minute_index, se.Ez/me.Ez AS Rz
+SELECT se.measure_pair_id, se.band, se.minute_index, se.Ez/me.Ez AS Rz
 FROM seis_energy se
-JOIN minimal_energy me ON se.measure_pair_id=me.measure_pair_id;
+JOIN minimal_energy me ON se.measure_pair_id=me.measure_pair_id AND se.band=me.band;
 
 CREATE VIEW grav_level
 AS
-SELECT se.measure_pair_id, ROUND(AVG(gmm.corr_grav), 4) AS quite_grav_level
+SELECT se.measure_pair_id, se.band, ROUND(AVG(gmm.corr_grav), 4) AS quite_grav_level
 FROM seis_energy AS se
-JOIN median_energy AS me ON me.measure_pair_id=se.measure_pair_id
+JOIN median_energy AS me ON me.measure_pair_id=se.measure_pair_id AND me.band=se.band
 JOIN measure_pairs mp ON me.measure_pair_id=mp.id
 JOIN gravity_measures_minutes gmm ON gmm.grav_dat_file_id=mp.grav_dat_file_id AND gmm.datetime_val=DATETIME(STRFTIME('%s', mp.datetime_start)+(se.minute_index + 1) * 60, 'unixepoch')
 WHERE se.Efull < me.Efull AND gmm.is_bad=0
-GROUP BY se.measure_pair_id;
+GROUP BY se.measure_pair_id, se.band;
 
 CREATE VIEW pre_correction
 AS
 SELECT mp.id AS measure_pair_id, gmm.id AS grav_measure_id,
-       gl.quite_grav_level, gmm.corr_grav, Rz
+       gl.quite_grav_level, gmm.corr_grav, Rz, se.band
 FROM seis_energy se
 JOIN measure_pairs mp ON mp.id=se.measure_pair_id
-JOIN minimal_energy me ON me.measure_pair_id=se.measure_pair_id
+JOIN minimal_energy me ON me.measure_pair_id=se.measure_pair_id AND me.band=se.band
 JOIN gravity_measures_minutes gmm ON gmm.grav_dat_file_id =mp.grav_dat_file_id AND gmm.datetime_val = DATETIME(STRFTIME('%s', mp.datetime_start)+(se.minute_index + 1) * 60, 'unixepoch')
-JOIN grav_level gl ON gl.measure_pair_id =se.measure_pair_id
-JOIN energy_ratio er ON er.measure_pair_id=se.measure_pair_id AND er.minute_index=se.minute_index;
+JOIN grav_level gl ON gl.measure_pair_id =se.measure_pair_id AND gl.band=se.band
+JOIN energy_ratio er ON er.measure_pair_id=se.measure_pair_id AND er.band=se.band AND er.minute_index=se.minute_index;
 
 CREATE VIEW sensor_pairs
 AS
@@ -217,10 +246,11 @@ SELECT l.chain_id, l.id AS link_id, mp.id AS measure_pair_id,
        gmm.id-(SELECT MIN(id)
                FROM gravity_measures_minutes
                WHERE grav_dat_file_id=gdf.id) + 1 AS cycle_index,
-       gmm.is_bad, ifnull(c.seis_corr, 0) AS seis_corr
+       gmm.is_bad, ifnull(c.seis_corr, 0) AS seis_corr,
+       ifnull(c.level_corr, 0) AS level_corr
 FROM gravity_measures_minutes gmm
 JOIN measure_pairs mp ON gmm.grav_dat_file_id=mp.grav_dat_file_id
 JOIN grav_dat_files gdf ON gdf.id =gmm.grav_dat_file_id
 JOIN links l ON l.filename=gdf.filename
-LEFT JOIN corrections c ON c.grav_measure_id=gmm.id
+LEFT JOIN corrections c ON c.grav_measure_id=gmm.id AND c.measure_pair_id=mp.id
 WHERE mp.id IN (SELECT id FROM measure_pairs);
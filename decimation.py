@@ -0,0 +1,126 @@
+from typing import Tuple, Union
+
+import numpy as np
+
+
+DEFAULT_POINTS_PER_PIXEL = 2
+PYRAMID_FACTOR = 8
+PYRAMID_MIN_SIZE = 1024
+
+
+def get_min_max_indexes(values: np.ndarray,
+                        buckets_count: int) -> np.ndarray:
+    size = values.shape[0]
+    bucket_size = int(np.ceil(size / buckets_count))
+    full_count = size // bucket_size
+    full_size = full_count * bucket_size
+
+    buckets = values[:full_size].reshape(full_count, bucket_size)
+    offsets = np.arange(full_count) * bucket_size
+    min_indexes = np.argmin(buckets, axis=1) + offsets
+    max_indexes = np.argmax(buckets, axis=1) + offsets
+    if full_size < size:
+        tail = values[full_size:]
+        min_indexes = np.append(min_indexes, full_size + np.argmin(tail))
+        max_indexes = np.append(max_indexes, full_size + np.argmax(tail))
+
+    indexes = np.column_stack((np.minimum(min_indexes, max_indexes),
+                               np.maximum(min_indexes, max_indexes)))
+    indexes = indexes.ravel()
+    if indexes[0] != 0:
+        indexes = np.insert(indexes, 0, 0)
+    if indexes[-1] != size - 1:
+        indexes = np.append(indexes, size - 1)
+    return indexes
+
+
+def decimate_min_max(
+        values: np.ndarray, pixels_count: int,
+        times: Union[np.ndarray, None] = None,
+        points_per_pixel=DEFAULT_POINTS_PER_PIXEL
+) -> Tuple[np.ndarray, np.ndarray]:
+    values = np.asarray(values)
+    points_count = max(int(pixels_count * points_per_pixel), 2)
+    if values.shape[0] <= points_count:
+        if times is None:
+            return np.arange(values.shape[0]), values
+        return np.asarray(times), values
+
+    indexes = get_min_max_indexes(values, points_count // 2)
+    if times is None:
+        return indexes, values[indexes]
+    return np.asarray(times)[indexes], values[indexes]
+
+
+def reduce_min_max(mins: np.ndarray, maxs: np.ndarray,
+                   factor: int) -> Tuple[np.ndarray, np.ndarray]:
+    size = mins.shape[0]
+    full_size = size // factor * factor
+    new_mins = mins[:full_size].reshape(-1, factor).min(axis=1)
+    new_maxs = maxs[:full_size].reshape(-1, factor).max(axis=1)
+    if full_size < size:
+        new_mins = np.append(new_mins, mins[full_size:].min())
+        new_maxs = np.append(new_maxs, maxs[full_size:].max())
+    return new_mins, new_maxs
+
+
+class MinMaxPyramid:
+    def __init__(self, values: np.ndarray, factor=PYRAMID_FACTOR,
+                 min_size=PYRAMID_MIN_SIZE):
+        self.values = np.asarray(values)
+        self.factor = factor
+        self.levels = []
+
+        mins, maxs = self.values, self.values
+        while mins.shape[0] > min_size:
+            mins, maxs = reduce_min_max(mins, maxs, factor)
+            self.levels.append((mins, maxs))
+
+    @property
+    def samples_count(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + sum(
+            (x.nbytes + y.nbytes for x, y in self.levels))
+
+    @property
+    def value_range(self) -> Tuple[float, float]:
+        if self.levels:
+            mins, maxs = self.levels[-1]
+        else:
+            mins, maxs = self.values, self.values
+        if mins.shape[0] == 0:
+            return 0., 0.
+        return float(mins.min()), float(maxs.max())
+
+    def get_level(self, samples_count: int, buckets_count: int) -> int:
+        level = 0
+        while level < len(self.levels) and \
+                samples_count // self.factor ** (level + 1) >= buckets_count:
+            level += 1
+        return level
+
+    def decimate(self, index_min: int, index_max: int, pixels_count: int,
+                 points_per_pixel=DEFAULT_POINTS_PER_PIXEL
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+        points_count = max(int(pixels_count * points_per_pixel), 2)
+        level = self.get_level(index_max - index_min, points_count // 2)
+        if level == 0:
+            indexes, values = decimate_min_max(
+                self.values[index_min:index_max], pixels_count,
+                points_per_pixel=points_per_pixel)
+            return indexes + index_min, values
+
+        bucket_size = self.factor ** level
+        bucket_start = index_min // bucket_size
+        bucket_stop = -(-index_max // bucket_size)
+        mins, maxs = self.levels[level - 1]
+        positions = np.arange(bucket_start, bucket_stop) * bucket_size
+        indexes = np.column_stack(
+            (positions, np.minimum(positions + bucket_size // 2,
+                                   self.samples_count - 1))).ravel()
+        values = np.column_stack((mins[bucket_start:bucket_stop],
+                                  maxs[bucket_start:bucket_stop])).ravel()
+        return indexes, values
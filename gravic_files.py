@@ -3,6 +3,8 @@ from datetime import datetime
 from datetime import timedelta
 import os
 
+import numpy as np
+
 
 CHAIN_EXTENSION = 'txt'
 TSF_EXTENSION = 'tsf'
@@ -12,6 +14,8 @@ CYCLE_EXTENSION = 'txt'
 DAT_FIRST_LINE_INDEX = 21
 TSF_FIRST_LINE_INDEX = 42
 TSF_SIGNAL_FREQUENCY = 10
+TSF_TAIL_BLOCK_SIZE = 4096
+TSF_ENCODING = 'latin-1'
 
 DAT_HEADER_FIRST_LINE = '/		CG-6 Survey'
 CYCLE_HEADER_FIRST_LINE = 'seans\tcycle\tzabrak\tpopravka'
@@ -60,12 +64,64 @@ class TSFile:
             raise OSError(f'File is not tsf-file')
 
         self.path = path
+        self.__data_offset = self.__get_data_offset()
         self.__first_line, self.__last_line = self.__get_last_lines()
 
+    def __get_data_offset(self) -> int:
+        lines_count = 0
+        with open(self.path, 'rb') as file_ctx:
+            while True:
+                offset = file_ctx.tell()
+                line = file_ctx.readline()
+                if not line:
+                    raise OSError(f'File {self.path} has no data')
+                if not line.strip():
+                    continue
+                if lines_count == TSF_FIRST_LINE_INDEX:
+                    return offset
+                lines_count += 1
+
     def __get_last_lines(self) -> Tuple[str, str]:
-        with open(self.path) as file_ctx:
-            lines = [x.rstrip() for x in file_ctx if len(x.rstrip())]
-        return lines[TSF_FIRST_LINE_INDEX], lines[-1]
+        with open(self.path, 'rb') as file_ctx:
+            _, first_line = self.__read_line_after(file_ctx,
+                                                   self.__data_offset)
+            file_size = file_ctx.seek(0, os.SEEK_END)
+            tail_offset = max(file_size - TSF_TAIL_BLOCK_SIZE,
+                              self.__data_offset)
+            file_ctx.seek(tail_offset)
+            tail = file_ctx.read().decode(TSF_ENCODING)
+        lines = [x.rstrip() for x in tail.splitlines() if len(x.rstrip())]
+        return first_line, lines[-1]
+
+    def __read_line_after(self, file_ctx,
+                          offset: int) -> Tuple[int, Union[str, None]]:
+        if offset > self.__data_offset:
+            file_ctx.seek(offset - 1)
+            file_ctx.readline()
+        else:
+            file_ctx.seek(self.__data_offset)
+        while True:
+            line_offset = file_ctx.tell()
+            line = file_ctx.readline()
+            if not line:
+                return line_offset, None
+            line = line.decode(TSF_ENCODING).rstrip()
+            if line:
+                return line_offset, line
+
+    def __find_line_offset(self, file_ctx, datetime_val: datetime) -> int:
+        low = self.__data_offset
+        high = file_ctx.seek(0, os.SEEK_END)
+        while low < high:
+            middle = (low + high) // 2
+            _, line = self.__read_line_after(file_ctx, middle)
+            if line is None or \
+                    self.__get_datetime_from_line(line) >= datetime_val:
+                high = middle
+            else:
+                low = middle + 1
+        line_offset, _ = self.__read_line_after(file_ctx, low)
+        return line_offset
 
     def __get_datetime_from_line(self, line: str):
         datetime_src = list(map(int, line.split()[:6]))
@@ -103,6 +159,41 @@ class TSFile:
                     seconds=1 / TSF_SIGNAL_FREQUENCY)
         return signal
 
+    def read_signal(self, datetime_start: Union[datetime, None] = None,
+                    datetime_stop: Union[datetime, None] = None
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+        if datetime_start is None:
+            datetime_start = self.datetime_start
+        if datetime_stop is None:
+            datetime_stop = self.datetime_stop
+
+        sample_offsets = np.arange(1, TSF_SIGNAL_FREQUENCY + 1) / \
+            TSF_SIGNAL_FREQUENCY - 1
+        times, values = [], []
+        with open(self.path, 'rb') as file_ctx:
+            file_ctx.seek(self.__find_line_offset(file_ctx, datetime_start))
+            for line in file_ctx:
+                line = line.decode(TSF_ENCODING).rstrip()
+                if not line:
+                    continue
+                line_datetime = self.__get_datetime_from_line(line)
+                one_second_signal = self.__get_signal_from_line(line)
+                line_seconds = (line_datetime -
+                                datetime_start).total_seconds()
+                times.append(
+                    line_seconds + sample_offsets[:len(one_second_signal)])
+                values.append(np.array(one_second_signal, dtype=np.float64))
+                if line_datetime >= datetime_stop:
+                    break
+
+        if not times:
+            return np.empty(0), np.empty(0)
+        times = np.round(np.concatenate(times), 6)
+        values = np.concatenate(values)
+        duration = (datetime_stop - datetime_start).total_seconds()
+        mask = (times >= 0) & (times <= duration)
+        return times[mask], values[mask]
+
 
 class DATFile:
     def __init__(self, path: str):
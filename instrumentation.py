@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache, wraps
+from typing import Callable, Dict, Iterable, Iterator, List
+
+
+REPORT_FILENAME = 'run_report.json'
+PROFILE_EXTENSION = 'prof'
+PROFILE_TOP_COUNT = 30
+MEMORY_TOP_COUNT = 20
+SLOW_QUERIES_LIMIT = 100
+SUMMARY_ROWS_COUNT = 20
+SPAN_DELIMITER = '/'
+QUERY_CACHE_SIZE = 1024
+VALUES_CLAUSE = ' VALUES'
+
+QUERY_LITERAL_PATTERN = re.compile(r'\'[^\']*\'|\b\d+(\.\d+)?\b')
+QUERY_SPACES_PATTERN = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    query = QUERY_LITERAL_PATTERN.sub('?', query)
+    return QUERY_SPACES_PATTERN.sub(' ', query).strip()
+
+
+def get_query_statement(query: str) -> str:
+    return query.partition(VALUES_CLAUSE)[0]
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def get_query_key(statement: str, has_values=False) -> str:
+    key = normalize_query(statement)
+    if has_values:
+        key += f'{VALUES_CLAUSE} (...)'
+    return key
+
+
+def create_timing() -> Dict[str, float]:
+    return {'count': 0, 'total_seconds': 0., 'max_seconds': 0.}
+
+
+def create_query_timing() -> Dict[str, float]:
+    timing = create_timing()
+    timing['rows'] = 0
+    return timing
+
+
+def update_timing(timing: Dict[str, float], seconds: float):
+    timing['count'] += 1
+    timing['total_seconds'] += seconds
+    timing['max_seconds'] = max(timing['max_seconds'], seconds)
+
+
+def merge_timing(timing: Dict[str, float], other: Dict[str, float]):
+    for name, value in other.items():
+        if name == 'max_seconds':
+            timing[name] = max(timing.get(name, 0.), value)
+        else:
+            timing[name] = timing.get(name, 0) + value
+
+
+def round_timings(timings: Dict[str, dict]) -> Dict[str, dict]:
+    result = dict()
+    for name, timing in sorted(timings.items(),
+                               key=lambda x: x[1]['total_seconds'],
+                               reverse=True):
+        result[name] = {x: round(y, 6) if isinstance(y, float) else y
+                        for x, y in timing.items()}
+    return result
+
+
+def format_query_summary(title: str, timings: Dict[str, dict],
+                         rows_count=SUMMARY_ROWS_COUNT) -> str:
+    name_width = max([len(title)] + [len(x) for x in timings])
+    lines = [f'{title:<{name_width}} {"calls":>8} {"total, s":>10} '
+             f'{"max, ms":>10} {"rows":>10}']
+    records = sorted(timings.items(), key=lambda x: x[1]['total_seconds'],
+                     reverse=True)[:rows_count]
+    for name, timing in records:
+        lines.append(f'{name:<{name_width}} {timing["count"]:>8} '
+                     f'{timing["total_seconds"]:>10.3f} '
+                     f'{timing["max_seconds"] * 1000:>10.2f} '
+                     f'{timing["rows"]:>10}')
+    return '\n'.join(lines)
+
+
+class RunTracker:
+    def __init__(self):
+        self.logger = logging.getLogger('Instrumentation')
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__profiler = None
+        self.__is_memory_tracing = False
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.datetime_start = datetime.now()
+            self.spans = dict()
+            self.counters = dict()
+            self.queries = dict()
+            self.methods = dict()
+            self.views = dict()
+            self.slow_queries = []
+            self.profiling = dict()
+
+    def __get_stack(self) -> List[str]:
+        if not hasattr(self.__local, 'stack'):
+            self.__local.stack = []
+        return self.__local.stack
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        stack = self.__get_stack()
+        stack.append(name)
+        full_name = SPAN_DELIMITER.join(stack)
+        time_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - time_start
+            stack.pop()
+            with self.__lock:
+                timing = self.spans.setdefault(full_name, create_timing())
+                update_timing(timing, seconds)
+
+    def count(self, name: str, value=1):
+        with self.__lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_query_timing(self, query: str, method: str,
+                         views: Iterable[str], seconds: float, rows=0):
+        statement = get_query_statement(query)
+        statement = get_query_key(statement, len(statement) < len(query))
+        with self.__lock:
+            groups = [(self.queries, statement), (self.methods, method)]
+            groups += [(self.views, x) for x in views]
+            for timings, name in groups:
+                timing = timings.get(name)
+                if timing is None:
+                    timing = timings[name] = create_query_timing()
+                update_timing(timing, seconds)
+                timing['rows'] += rows
+
+    def add_slow_query(self, query: str, method: str, seconds: float,
+                       plan: List[str]):
+        with self.__lock:
+            if len(self.slow_queries) >= SLOW_QUERIES_LIMIT:
+                return
+            self.slow_queries.append(
+                {'method': method, 'seconds': round(seconds, 6),
+                 'query': query, 'plan': plan})
+
+    def merge(self, report: dict):
+        prefix = SPAN_DELIMITER.join(self.__get_stack())
+        spans = {f'{prefix}{SPAN_DELIMITER}{x}' if prefix else x: y
+                 for x, y in report.get('spans', {}).items()}
+        with self.__lock:
+            groups = [(self.spans, spans),
+                      (self.queries, report.get('queries', {})),
+                      (self.methods, report.get('methods', {})),
+                      (self.views, report.get('views', {}))]
+            for timings, other_timings in groups:
+                for name, other in other_timings.items():
+                    merge_timing(timings.setdefault(name, dict()), other)
+            for name, value in report.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            free_count = SLOW_QUERIES_LIMIT - len(self.slow_queries)
+            self.slow_queries += report.get('slow_queries', [])[:free_count]
+
+    def get_query_summary(self) -> str:
+        with self.__lock:
+            tables = [format_query_summary('method', self.methods)]
+            if self.views:
+                tables.append(format_query_summary('view', self.views))
+        return '\n\n'.join(tables)
+
+    def start_profiling(self, is_cpu_profiling=False,
+                        is_memory_tracing=False):
+        if is_cpu_profiling:
+            self.__profiler = cProfile.Profile()
+            self.__profiler.enable()
+        if is_memory_tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__is_memory_tracing = True
+
+    def stop_profiling(self, folder: str, stage: str):
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            path = os.path.join(folder, f'{stage}.{PROFILE_EXTENSION}')
+            self.__profiler.dump_stats(path)
+            stats = pstats.Stats(self.__profiler)
+            top_functions = sorted(
+                stats.stats.items(), key=lambda x: x[1][3],
+                reverse=True)[:PROFILE_TOP_COUNT]
+            self.profiling['cpu_profile_path'] = path
+            self.profiling['cpu_top'] = [
+                {'function': f'{x[0][0]}:{x[0][1]}({x[0][2]})',
+                 'calls': x[1][1], 'cumulative_seconds': round(x[1][3], 6)}
+                for x in top_functions]
+            self.__profiler = None
+
+        if self.__is_memory_tracing and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current_size, peak_size = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.__is_memory_tracing = False
+            self.profiling['memory_current_mb'] = round(
+                current_size / 1024 ** 2, 3)
+            self.profiling['memory_peak_mb'] = round(
+                peak_size / 1024 ** 2, 3)
+            self.profiling['memory_top'] = [
+                {'location': str(x.traceback), 'size_kb':
+                    round(x.size / 1024, 3), 'count': x.count}
+                for x in snapshot.statistics('lineno')[:MEMORY_TOP_COUNT]]
+
+    def to_dict(self) -> dict:
+        with self.__lock:
+            return {
+                'datetime_start': self.datetime_start.isoformat(),
+                'datetime_stop': datetime.now().isoformat(),
+                'spans': round_timings(self.spans),
+                'counters': dict(self.counters),
+                'queries': round_timings(self.queries),
+                'methods': round_timings(self.methods),
+                'views': round_timings(self.views),
+                'slow_queries': list(self.slow_queries),
+                'profiling': dict(self.profiling)
+            }
+
+    def save_report(self, folder: str, stage: str, status: str) -> str:
+        path = os.path.join(folder, REPORT_FILENAME)
+        report = dict()
+        if os.path.exists(path):
+            try:
+                with open(path) as file_ctx:
+                    report = json.load(file_ctx)
+            except (OSError, ValueError):
+                self.logger.error(f'Run report {path} is broken. Rewritten')
+
+        stage_report = self.to_dict()
+        stage_report['status'] = status
+        report.setdefault('stages', dict())[stage] = stage_report
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as file_ctx:
+            json.dump(report, file_ctx, indent=4)
+        os.replace(tmp_path, path)
+        self.logger.info(f'Run report for stage {stage} saved to {path}')
+        return path
+
+
+RUN_TRACKER = RunTracker()
+
+
+def span(name: str):
+    return RUN_TRACKER.span(name)
+
+
+def count(name: str, value=1):
+    RUN_TRACKER.count(name, value)
+
+
+def traced(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with RUN_TRACKER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def run_report(folder: str, stage: str, is_cpu_profiling=False,
+               is_memory_tracing=False) -> Iterator[RunTracker]:
+    RUN_TRACKER.reset()
+    RUN_TRACKER.start_profiling(is_cpu_profiling, is_memory_tracing)
+    is_enabled, RUN_TRACKER.enabled = RUN_TRACKER.enabled, True
+    status = 'failed'
+    try:
+        with RUN_TRACKER.span(stage):
+            yield RUN_TRACKER
+        status = 'done'
+    finally:
+        RUN_TRACKER.enabled = is_enabled
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        RUN_TRACKER.stop_profiling(folder, stage)
+        RUN_TRACKER.save_report(folder, stage, status)
+        if RUN_TRACKER.methods:
+            RUN_TRACKER.logger.info(
+                f'Query summary for stage {stage}:\n'
+                f'{RUN_TRACKER.get_query_summary()}')
@@ -10,6 +10,8 @@ from coordinates_file import CoordinatesFile
 
 from dbase import SqliteDbase
 from config import ConfigFile
+from seismic_reader import ChannelStatsCache
+from instrumentation import count, run_report, traced
 
 
 class Loader:
@@ -18,11 +20,14 @@ class Loader:
             raise OSError
 
         self.config_file = ConfigFile(config_file)
-        self.dbase = SqliteDbase(self.config_file.export_root)
+        self.dbase = SqliteDbase(self.config_file.export_root,
+                                 self.config_file.slow_query_seconds)
+        self.channel_stats = ChannelStatsCache(self.dbase)
         self.gravimetric_root = self.config_file.gravimetric_root
         self.seismic_root = self.config_file.seismic_root
         self.logger = logging.getLogger('Loader')
 
+    @traced('load_chain_cycle_files')
     def load_chain_cycle_files(self):
         self.logger.debug('Loading chains...')
         for root, _, files in os.walk(self.gravimetric_root):
@@ -45,6 +50,7 @@ class Loader:
                                       f'cycle file not found')
                     continue
 
+                count('chain_files_parsed')
                 chain_id = self.dbase.add_chain(chain_file.sensor_part_name,
                                                 chain_path, cycle_path)
                 for link_file, link_id in chain_file.links.items():
@@ -58,6 +64,7 @@ class Loader:
             return
         self.dbase.add_gravity_minute_measures(id_val, dat_file.measures)
 
+    @traced('load_dat_files')
     def load_dat_files(self):
         self.logger.debug('Loading dat-files...')
         for root, _, files in os.walk(self.gravimetric_root):
@@ -69,6 +76,8 @@ class Loader:
                 except OSError:
                     self.logger.debug(f'File {path} skipped')
                     continue
+                count('dat_files_parsed')
+                count('bytes_read', os.path.getsize(path))
 
                 if not dat_file.is_good_measures_data:
                     self.logger.error(
@@ -85,6 +94,7 @@ class Loader:
                 self.logger.debug(f'DAT-file {path} added')
         self.logger.debug('Loading dat-files finished')
 
+    @traced('load_tsf_files')
     def load_tsf_files(self):
         self.logger.debug('Loading tsf-files...')
         for root, _, files in os.walk(self.gravimetric_root):
@@ -95,11 +105,14 @@ class Loader:
                     tsf_file = TSFile(path)
                 except OSError:
                     continue
+                count('tsf_files_parsed')
+                count('bytes_read', os.path.getsize(path))
                 self.dbase.add_grav_tsf_file(tsf_file.device_num_part,
                                              tsf_file.datetime_start,
                                              tsf_file.datetime_stop, path)
                 self.logger.debug(f'TSF-file {path} added')
 
+    @traced('load_seismic_files')
     def load_seismic_files(self):
         self.logger.debug('Loading seismic files...')
         for root, _, files in os.walk(self.seismic_root):
@@ -121,11 +134,15 @@ class Loader:
                     self.logger.error(f'Bad header for file {path}. Skipped')
                     continue
 
+                count('seismic_files_parsed')
+                count('bytes_read', os.path.getsize(path))
                 self.dbase.add_seis_file(sensor, station, dt_start, dt_stop,
                                          path)
+                self.channel_stats.get(path)
                 self.logger.debug(f'Seismic file {path} added')
         self.logger.debug('Loading seismic files finished')
 
+    @traced('load_station_coordinates')
     def load_station_coordinates(self):
         self.logger.debug('Loading points coordinates...')
         file_path = self.config_file.coordinates_file_path
@@ -137,6 +154,7 @@ class Loader:
             x_wgs84, y_wgs84 = coords
             self.dbase.add_station(point_name, x_wgs84, y_wgs84)
 
+    @traced('load_gravity_defect_markers')
     def load_gravity_defect_markers(self):
         self.logger.debug('Loading gravity defect markers...')
         preparing_data = self.dbase.get_grav_defect_input_preparing()
@@ -151,9 +169,12 @@ class Loader:
                                                   defect_markers)
 
     def run(self):
-        self.load_chain_cycle_files()
-        self.load_dat_files()
-        self.load_tsf_files()
-        self.load_gravity_defect_markers()
-        self.load_seismic_files()
-        self.load_station_coordinates()
+        with run_report(self.config_file.export_root, 'loader',
+                        self.config_file.is_cpu_profiling,
+                        self.config_file.is_memory_tracing):
+            self.load_chain_cycle_files()
+            self.load_dat_files()
+            self.load_tsf_files()
+            self.load_gravity_defect_markers()
+            self.load_seismic_files()
+            self.load_station_coordinates()
@@ -1,58 +1,134 @@
 from datetime import datetime
 from datetime import timedelta
+import argparse
+import hashlib
 import logging
+import multiprocessing
 import os
-from typing import List, Tuple, NamedTuple
+from typing import Dict, Iterable, Iterator, List, Tuple, NamedTuple, Union
 
-import matplotlib.pyplot as plt
+import numpy as np
 import matplotlib.ticker as ticker
-from matplotlib.pyplot import Figure, Axes
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.patches as patches
 
-from seiscore import BinaryFile
-
 from config import ConfigFile
 from dbase import SqliteDbase
+from dbase import SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE
 from gravic_files import TSFile
+from decimation import decimate_min_max
+from seismic_reader import ChunkedSignalReader, ChannelStatsCache
+from instrumentation import RUN_TRACKER, count, run_report, span, traced
 
 
 EXPORT_GRAPHICS_FOLDER_NAME = 'graphics'
-
-
-def read_z_signal(path: str) -> List[Tuple[datetime, float]]:
-    bin_data = BinaryFile(path, use_avg_values=True)
-    signal = bin_data.read_signal('Z')
-    z_signal = []
-    for i, amplitude in enumerate(signal):
-        diff_time = timedelta(seconds=i / bin_data.resample_frequency)
-        dt_val = bin_data.datetime_start + diff_time
-        z_signal.append((dt_val, amplitude))
-    return z_signal
+WORKERS_START_METHOD = 'spawn'
+PLOT_MARGIN_MINUTES = 1
+PLOT_FINGERPRINT_VERSION = 1
+MISSING_FILE_MARKER = 'missing'
+PLOT_BATCH_SIZE = 200
+PLOT_DPI = 150
+PLOT_WORKER_CONTEXT = dict()
+
+
+def create_fingerprint(*items) -> str:
+    fingerprint = hashlib.sha1()
+    for item in items:
+        if isinstance(item, np.ndarray):
+            fingerprint.update(np.ascontiguousarray(item).tobytes())
+        else:
+            fingerprint.update(repr(item).encode())
+        fingerprint.update(b'|')
+    return fingerprint.hexdigest()
+
+
+def split_records(records: np.ndarray) -> Dict[int, np.ndarray]:
+    if not records.shape[0]:
+        return dict()
+    ids = records[:, 0].astype(int)
+    unique_ids, indexes = np.unique(ids, return_index=True)
+    return dict(zip(unique_ids.tolist(), np.split(records, indexes[1:])))
+
+
+def generate_filename(info: Tuple[str, str, str, str]) -> str:
+    return '_'.join(info).replace('.', '-') + '.png'
+
+
+def generate_title(info: Tuple[str, str, str, str]) -> str:
+    return f'Результат ввода поправок (пункт № {info[0]} гравиметр ' \
+           f'{info[1]} сейсмометр {info[2]} дата {info[3]})'
+
+
+def read_z_signal(path: str, datetime_origin: datetime,
+                  mean: Union[float, None] = None,
+                  datetime_stop: Union[datetime, None] = None
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+    reader = ChunkedSignalReader(path, 'Z', mean=mean)
+    times, values = [], []
+    for block in reader.read_blocks(datetime_origin, datetime_stop):
+        block_seconds = (block.datetime_start -
+                         datetime_origin).total_seconds()
+        samples_count = block.signal.shape[0]
+        times.append(block_seconds +
+                     np.arange(samples_count) / block.frequency)
+        values.append(block.signal)
+    if not times:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(times), np.concatenate(values)
 
 
 class GravityData(NamedTuple):
     quite_level: float
-    src_minutes_measures: List[Tuple[datetime, float, bool]]
-    src_seconds_measures: List[Tuple[datetime, float]]
-    corr_minutes_measures: List[Tuple[datetime, float]]
+    minutes_times: np.ndarray
+    src_minutes_values: np.ndarray
+    bad_minutes_mask: np.ndarray
+    corr_minutes_values: np.ndarray
+    seconds_times: np.ndarray
+    seconds_values: np.ndarray
 
 
 class SeismicData(NamedTuple):
     quite_level: float
-    seis_energy: List[Tuple[datetime, float]]
-    src_z_signal: List[Tuple[datetime, float]]
+    energy_times: np.ndarray
+    energy_values: np.ndarray
+    z_signal_times: np.ndarray
+    z_signal_values: np.ndarray
+
+
+class PlotInput(NamedTuple):
+    measure_pair_id: int
+    title: str
+    filename: str
+    datetime_start: datetime
+    datetime_stop: datetime
+    tsf_file_path: str
+    seis_file_path: str
+    grav_quite_level: float
+    seis_quite_level: float
+    quite_minute_seconds: float
+    minutes_times: np.ndarray
+    src_minutes_values: np.ndarray
+    bad_minutes_mask: np.ndarray
+    corr_minutes_values: np.ndarray
+    energy_times: np.ndarray
+    energy_values: np.ndarray
 
 
 class Plot:
-    def __init__(self, title: str, grav_data: GravityData,
-                 seis_data: SeismicData, quite_minute_start: datetime,
-                 export_path: str):
-        self.title = title
+    def __init__(self):
         self.__fig, self.__axs = self.prepare()
-        self.grav_data = grav_data
-        self.seis_data = seis_data
-        self.quite_minute_start = quite_minute_start
-        self.export_path = export_path
+        self.__fillings = [None, None]
+        self.grav_data = None
+        self.seis_data = None
+        self.quite_minute_seconds = 0.
+
+        self.prepare_grav_minutes_data()
+        self.prepare_seismic_energy()
+        self.prepare_src_gravity_signal()
+        self.prepare_src_seismic_signal()
+        self.prepare_quite_minute()
 
     @property
     def figure(self) -> Figure:
@@ -62,201 +138,161 @@ class Plot:
     def subplots(self) -> Axes:
         return self.__axs
 
-    def prepare(self):
-        plt.switch_backend('SVG')
+    def get_pixels_width(self, subplot: Axes) -> int:
+        return int(np.ceil(subplot.get_window_extent().width))
+
+    def get_minutes_indexes(self) -> np.ndarray:
+        return np.arange(self.grav_data.minutes_times.shape[0])
 
-        fig, axs = plt.subplots(4, 1)
+    def prepare(self):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        axs = fig.subplots(4, 1)
         fig.set_size_inches(12, 16)
-        fig.dpi = 150
+        fig.dpi = PLOT_DPI
         fig.tight_layout(pad=6)
 
-        fig.suptitle(self.title, fontname='Times New Roman', fontsize=16)
+        self.__title = fig.suptitle('', fontname='Times New Roman',
+                                    fontsize=16)
         return fig, axs
 
-    def add_src_grav_minutes_measures(self):
+    def replace_filling(self, index: int, subplot: Axes, x: np.ndarray,
+                        y_first, y_second, color: str):
+        if self.__fillings[index] is not None:
+            self.__fillings[index].remove()
+        self.__fillings[index] = subplot.fill_between(
+            x, y_first, y_second, alpha=0.1, color=color, zorder=0.9)
+
+    def set_yticklabels_font(self, subplot: Axes):
+        for label in subplot.get_yticklabels():
+            label.set_fontname('Times New Roman')
+
+    def prepare_grav_minutes_data(self):
         subplot = self.subplots[0]
         subplot.set_title('Сводный график гравиметрических данных',
                           fontname='Times New Roman')
-        x = [i for i in range(len(self.grav_data.src_minutes_measures))]
-
-        src_measures = [x[1] for x in self.grav_data.src_minutes_measures]
-        subplot.plot(
-            x, src_measures, color='cornflowerblue',
-            alpha=1, linewidth=1.5,
+        self.__src_minutes_line, = subplot.plot(
+            [], [], color='cornflowerblue', alpha=1, linewidth=1.5,
             label='Исходное значение силы тяжести, мГал')
-
-    def add_corr_grav_minute_measures(self):
-        subplot = self.subplots[0]
-        x = [i for i in range(len(self.grav_data.src_minutes_measures))]
-        corr_measures = [x[1] for x in self.grav_data.corr_minutes_measures]
-        subplot.plot(
-            x, corr_measures, color='lightcoral', alpha=1,
+        self.__corr_minutes_line, = subplot.plot(
+            [], [], color='lightcoral', alpha=1,
             label='Исправленное значение силы тяжести, мГал', linewidth=1.5)
+        self.__grav_level_line, = subplot.plot(
+            [], [], linestyle='dashed', color='blueviolet', alpha=0.5,
+            linewidth=1.5, label='Сейсмически тихий уровень')
+        self.__bad_scatter = subplot.scatter(
+            [], [], marker='^', color='red', alpha=1, s=20,
+            label='Забракованные измерения')
+        self.__good_scatter = subplot.scatter(
+            [], [], marker='^', color='blue', alpha=1, s=20,
+            label='Принятые измерения к обработке')
 
-    def create_gravity_curve_filling(self):
-        subplot = self.subplots[0]
-        x = [i for i in range(len(self.grav_data.src_minutes_measures))]
-        src_measures = [x[1] for x in self.grav_data.src_minutes_measures]
-        corr_measures = [x[1] for x in self.grav_data.corr_minutes_measures]
-
-        subplot.fill_between(x, src_measures, corr_measures,
-                             alpha=0.1, color='green')
-
-    def add_gravity_quite_level(self):
-        subplot = self.subplots[0]
-        x_limits = 0, len(self.grav_data.src_minutes_measures) - 1
-        level_line = [x_limits, [self.grav_data.quite_level] * 2]
-
-        subplot.plot(*level_line, linestyle='dashed', color='blueviolet',
-                     alpha=0.5, linewidth=1.5,
-                     label='Сейсмически тихий уровень')
-
-    def add_gravity_defect_info(self):
-        bad_x_scatter, bad_y_scatter = [], []
-        good_x_scatter, good_y_scatter = [], []
-        for i in range(len(self.grav_data.src_minutes_measures)):
-            grav_value = self.grav_data.src_minutes_measures[i][1]
-            is_bad = self.grav_data.src_minutes_measures[i][2]
-            if is_bad:
-                bad_x_scatter.append(i)
-                bad_y_scatter.append(grav_value)
-            else:
-                good_x_scatter.append(i)
-                good_y_scatter.append(grav_value)
-
-        subplot = self.subplots[0]
-        subplot.scatter(bad_x_scatter, bad_y_scatter, marker='^',
-                        color='red', alpha=1, s=20,
-                        label='Забракованные измерения')
-        subplot.scatter(good_x_scatter, good_y_scatter,
-                        marker='^', color='blue', alpha=1, s=20,
-                        label='Принятые измерения к обработке')
-
-    def format_plot_gravity_minutes_measures(self):
-        subplot = self.subplots[0]
-        subplot.set_title('Сводный график гравиметрических данных',
-                          fontname='Times New Roman')
         subplot.grid(which='major', color='k', alpha=0.2)
-
-        x_limits = 0, len(self.grav_data.src_minutes_measures) - 1
-        subplot.set_xlim(*x_limits)
-
         subplot.xaxis.set_major_locator(ticker.MultipleLocator(1))
         subplot.set_xlabel('Индекс минуты измерений',
                            fontname='Times New Roman')
         subplot.legend(prop={'family': 'Times New Roman'}, loc='center',
                        bbox_to_anchor=(0.5, -0.25), shadow=False, ncol=4)
-
-        subplot.set_yticklabels(
-            ['{:.4f}'.format(x) for x in subplot.get_yticks()],
-            fontname='Times New Roman')
+        subplot.yaxis.set_major_formatter(
+            ticker.FormatStrFormatter('%.4f'))
         subplot.set_ylabel('Сила тяжести, мГал', fontname='Times New Roman')
 
     def plot_grav_minutes_data(self):
-        self.add_src_grav_minutes_measures()
-        self.add_corr_grav_minute_measures()
-        self.create_gravity_curve_filling()
-
-        self.add_gravity_quite_level()
-        self.add_gravity_defect_info()
-
-        self.format_plot_gravity_minutes_measures()
-
-    def get_seismic_energy_x_axis(self) -> List[int]:
-        x_ticks = []
-        for item in self.seis_data.seis_energy:
-            datetime_val = item[0]
-            diff_time = (datetime_val - self.grav_data.src_minutes_measures[0][0])
-            minute_index = int(diff_time.total_seconds() / 60)
-            x_ticks.append(minute_index)
-        return x_ticks
-
-    def get_src_gravity_x_axis(self) -> List[float]:
-        x_ticks = []
-        dt_start = self.grav_data.src_seconds_measures[0][0]
-        for item in self.grav_data.src_seconds_measures:
-            datetime_val = item[0]
-            diff_time = (datetime_val - dt_start)
-            minute_index = diff_time.total_seconds()
-            x_ticks.append(minute_index)
-        return x_ticks
-
-    def get_src_seismic_x_axis(self) -> List[float]:
-        x_ticks = []
-        dt_start = self.grav_data.src_seconds_measures[0][0]
-        for item in self.seis_data.src_z_signal:
-            datetime_val = item[0]
-            diff_time = (datetime_val - dt_start)
-            minute_index = diff_time.total_seconds()
-            x_ticks.append(minute_index)
-        return x_ticks
+        subplot = self.subplots[0]
+        x = self.get_minutes_indexes()
+        src_values = self.grav_data.src_minutes_values
+        corr_values = self.grav_data.corr_minutes_values
+        self.__src_minutes_line.set_data(x, src_values)
+        self.__corr_minutes_line.set_data(x, corr_values)
+        self.replace_filling(0, subplot, x, src_values, corr_values,
+                             'green')
+
+        x_limits = 0, x.shape[0] - 1
+        self.__grav_level_line.set_data(x_limits,
+                                        [self.grav_data.quite_level] * 2)
+
+        bad_mask = self.grav_data.bad_minutes_mask
+        self.__bad_scatter.set_offsets(
+            np.column_stack((x[bad_mask], src_values[bad_mask])))
+        self.__good_scatter.set_offsets(
+            np.column_stack((x[~bad_mask], src_values[~bad_mask])))
 
-    def plot_seismic_energy(self):
+        subplot.set_xlim(*x_limits)
+        subplot.relim()
+        subplot.autoscale_view(scalex=False)
+        self.set_yticklabels_font(subplot)
+
+    def get_seismic_energy_x_axis(self) -> np.ndarray:
+        diff_times = self.seis_data.energy_times - \
+            self.grav_data.minutes_times[0]
+        return (diff_times / 60).astype(int)
+
+    def prepare_seismic_energy(self):
         subplot = self.subplots[1]
         subplot.set_title(
             'Энергетическая характеристика сейсмических колебаний '
             '(Z-компонента)', fontname='Times New Roman')
-
-        x = self.get_seismic_energy_x_axis()
-        energies = [x[1] for x in self.seis_data.seis_energy]
-        subplot.plot(x, energies, color='mediumblue',
-                    alpha=1, linewidth=1.5,
-                    label='Поминутное значение энергии')
-
-        seis_level_line = [[x[0], x[-1]], [self.seis_data.quite_level] * 2]
-        subplot.plot(*seis_level_line, color='seagreen', alpha=0.5,
-                     linewidth=1.5, label='Сейсмически тихий уровень',
-                     linestyle='dashed')
-
-        subplot.fill_between(x, energies,
-                             [self.seis_data.quite_level] * len(x),
-                             alpha=0.1, color='blue')
+        self.__energy_line, = subplot.plot(
+            [], [], color='mediumblue', alpha=1, linewidth=1.5,
+            label='Поминутное значение энергии')
+        self.__seis_level_line, = subplot.plot(
+            [], [], color='seagreen', alpha=0.5, linewidth=1.5,
+            label='Сейсмически тихий уровень', linestyle='dashed')
 
         subplot.sharex(self.subplots[0])
         subplot.grid(which='major', color='k', alpha=0.2)
         subplot.xaxis.set_major_locator(ticker.MultipleLocator(1))
         subplot.set_xlabel('Индекс минуты измерений',
                            fontname='Times New Roman')
-        subplot.set_yticklabels([str(int(x)) for x in subplot.get_yticks()],
-                                fontname='Times New Roman')
+        subplot.yaxis.set_major_formatter(
+            ticker.FuncFormatter(lambda x, _: str(int(x))))
         subplot.set_ylabel('Энергия, усл. ед', fontname='Times New Roman')
 
         subplot.legend(prop={'family': 'Times New Roman'}, loc='center',
                        bbox_to_anchor=(0.5, -0.2), shadow=False, ncol=2)
 
-    def plot_quite_minute(self):
-        dt_start = self.grav_data.src_seconds_measures[0][0]
-        x_start = (self.quite_minute_start - dt_start).total_seconds()
-
-        subplot = self.subplots[2]
-        grav_ampls = [x[1] for x in self.grav_data.src_seconds_measures]
-        amp_min, amp_max = min(grav_ampls), max(grav_ampls)
-        rectangle = patches.Rectangle(
-            (x_start, amp_min), 60, amp_max - amp_min,
-            color='seagreen', alpha=0.5, label='Тихий участок сигнала')
-        subplot.add_patch(rectangle)
-
-        subplot = self.subplots[3]
-        seis_ampls = [x[1] for x in self.seis_data.src_z_signal]
-        amp_min, amp_max = min(seis_ampls), max(seis_ampls)
-        rectangle = patches.Rectangle(
-            (x_start, amp_min), 60, amp_max - amp_min,
-            color='seagreen', alpha=0.5, label='Тихий участок сигнала')
-        subplot.add_patch(rectangle)
+    def plot_seismic_energy(self):
+        subplot = self.subplots[1]
+        x = self.get_seismic_energy_x_axis()
+        energies = self.seis_data.energy_values
+        self.__energy_line.set_data(x, energies)
+        if x.shape[0]:
+            self.__seis_level_line.set_data(
+                [x[0], x[-1]], [self.seis_data.quite_level] * 2)
+        self.replace_filling(1, subplot, x, energies,
+                             self.seis_data.quite_level, 'blue')
+
+        subplot.relim()
+        subplot.autoscale_view(scalex=False)
+        self.set_yticklabels_font(subplot)
+
+    def prepare_quite_minute(self):
+        self.__quite_rectangles = []
+        for subplot in self.subplots[2:]:
+            rectangle = patches.Rectangle(
+                (0, 0), 60, 0, color='seagreen', alpha=0.5,
+                label='Тихий участок сигнала', visible=False)
+            subplot.add_patch(rectangle)
+            self.__quite_rectangles.append(rectangle)
 
-    def plot_src_gravity_signal(self):
+    def plot_quite_minute(self):
+        signals = (self.grav_data.seconds_values,
+                   self.seis_data.z_signal_values)
+        for rectangle, amplitudes in zip(self.__quite_rectangles, signals):
+            amp_min, amp_max = amplitudes.min(), amplitudes.max()
+            rectangle.set_bounds(self.quite_minute_seconds, amp_min, 60,
+                                 amp_max - amp_min)
+            rectangle.set_visible(True)
+
+    def prepare_src_gravity_signal(self):
         subplot = self.subplots[2]
         subplot.set_title('Исходная гравиметрическая запись',
                           fontname='Times New Roman')
-
-        x = self.get_src_gravity_x_axis()
-        amplitudes = [x[1] for x in self.grav_data.src_seconds_measures]
-        subplot.plot(x, amplitudes, color='crimson',
-                     alpha=1, linewidth=1,
-                     label='Исходный гравиметрический сигнал')
+        self.__src_gravity_line, = subplot.plot(
+            [], [], color='crimson', alpha=1, linewidth=1,
+            label='Исходный гравиметрический сигнал')
 
         subplot.grid(which='major', color='k', alpha=0.2)
-        subplot.set_xlim(x[0], x[-1])
         subplot.xaxis.set_major_locator(ticker.MultipleLocator(60))
         subplot.set_xlabel('Время, с', fontname='Times New Roman')
         subplot.set_ylabel('Амплитуда, усл. ед', fontname='Times New Roman')
@@ -264,16 +300,25 @@ class Plot:
         subplot.legend(prop={'family': 'Times New Roman'}, loc='center',
                        bbox_to_anchor=(0.5, -0.2), shadow=False, ncol=2)
 
-    def plot_src_seismic_signal(self):
+    def plot_src_gravity_signal(self):
+        subplot = self.subplots[2]
+        x, amplitudes = decimate_min_max(
+            self.grav_data.seconds_values, self.get_pixels_width(subplot),
+            self.grav_data.seconds_times)
+        self.__src_gravity_line.set_data(x, amplitudes)
+
+        if x.shape[0]:
+            subplot.set_xlim(x[0], x[-1])
+        subplot.relim(visible_only=True)
+        subplot.autoscale_view(scalex=False)
+
+    def prepare_src_seismic_signal(self):
         subplot = self.subplots[3]
         subplot.set_title('Исходная сейсмическая запись (Z-компонента)',
                           fontname='Times New Roman')
-
-        x = self.get_src_seismic_x_axis()
-        amplitudes = [x[1] for x in self.seis_data.src_z_signal]
-        subplot.plot(x, amplitudes, color='cornflowerblue',
-                     alpha=1, linewidth=1,
-                     label='Исходный сейсмический сигнал (Z-компонента)')
+        self.__src_seismic_line, = subplot.plot(
+            [], [], color='cornflowerblue', alpha=1, linewidth=1,
+            label='Исходный сейсмический сигнал (Z-компонента)')
         subplot.sharex(self.subplots[2])
 
         subplot.grid(which='major', color='k', alpha=0.2)
@@ -283,27 +328,57 @@ class Plot:
         subplot.legend(prop={'family': 'Times New Roman'}, loc='center',
                        bbox_to_anchor=(0.5, -0.2), shadow=False, ncol=2)
 
-    def run(self):
+    def plot_src_seismic_signal(self):
+        subplot = self.subplots[3]
+        x, amplitudes = decimate_min_max(
+            self.seis_data.z_signal_values, self.get_pixels_width(subplot),
+            self.seis_data.z_signal_times)
+        self.__src_seismic_line.set_data(x, amplitudes)
+
+        subplot.relim(visible_only=True)
+        subplot.autoscale_view(scalex=False)
+
+    def draw(self, title: str, grav_data: GravityData,
+             seis_data: SeismicData, quite_minute_seconds: float):
+        self.__title.set_text(title)
+        self.grav_data = grav_data
+        self.seis_data = seis_data
+        self.quite_minute_seconds = quite_minute_seconds
+        for rectangle in self.__quite_rectangles:
+            rectangle.set_visible(False)
+
         self.plot_grav_minutes_data()
         self.plot_seismic_energy()
         self.plot_src_gravity_signal()
         self.plot_src_seismic_signal()
-        plt.savefig(self.export_path, dpi=150)
 
-        self.figure.clear()
-        plt.close(self.figure)
+    def render(self, title: str, grav_data: GravityData,
+               seis_data: SeismicData, quite_minute_seconds: float,
+               export_path: str):
+        self.draw(title, grav_data, seis_data, quite_minute_seconds)
+        self.figure.savefig(export_path, dpi=PLOT_DPI)
 
 
 class Plotting:
-    def __init__(self, config_file_path: str):
+    def __init__(self, config_file_path: str, is_read_only=False):
         if not os.path.exists(config_file_path):
             raise OSError
 
         self.config = ConfigFile(config_file_path)
-        self.dbase = SqliteDbase(self.config.export_root)
+        self.dbase = SqliteDbase(self.config.export_root,
+                                 self.config.slow_query_seconds,
+                                 is_read_only)
+        self.channel_stats = ChannelStatsCache(self.dbase)
         self.logger = logging.getLogger('Plotting')
+        self.__plot = None
         self.__create_export_folder()
 
+    @property
+    def plot(self) -> Plot:
+        if self.__plot is None:
+            self.__plot = Plot()
+        return self.__plot
+
     @property
     def export_folder_path(self) -> str:
         return os.path.join(self.config.export_root,
@@ -313,51 +388,223 @@ class Plotting:
         if not os.path.exists(self.export_folder_path):
             os.makedirs(self.export_folder_path)
 
-    def generate_filename(self, measure_pair_id: int) -> str:
-        info = self.dbase.get_sensor_pair_info(measure_pair_id)
-        return '_'.join(info).replace('.', '-') + '.png'
-
-    def generate_title(self, ti_id: int) -> str:
-        info = self.dbase.get_sensor_pair_info(ti_id)
-        title = f'Результат ввода поправок (пункт № {info[0]} гравиметр ' \
-                f'{info[1]} сейсмометр {info[2]} дата {info[3]})'
-        return title
-
-    def create_plot(self, measure_pair_id: int):
-        src_grav_m = self.dbase.get_grav_minute_measures(measure_pair_id)
-        corr_val = self.dbase.get_seis_corrections(measure_pair_id)
-        corr_grav_m = [(x[0], x[1] + corr_val[i]) for i, x in
-                       enumerate(src_grav_m)]
-        quite_level = self.dbase.get_grav_level(measure_pair_id)
-        if not quite_level:
-            return
-
-        tsf_file_path = self.dbase.get_tsf_file_path(measure_pair_id)
-        tsf_data = TSFile(tsf_file_path)
-        src_seconds_measures = tsf_data.src_signal
-
-        grav_data = GravityData(quite_level, src_grav_m, src_seconds_measures,
-                                corr_grav_m)
-
-        seis_energy = self.dbase.get_seis_energy(measure_pair_id)
-        seis_level = self.dbase.get_seis_level(measure_pair_id)
-
-        seis_file_path = self.dbase.get_seis_file_path(measure_pair_id)
-        z_signal = read_z_signal(seis_file_path)
-
-        seis_data = SeismicData(seis_level, seis_energy, z_signal)
-
-        quite_minute = self.dbase.get_quite_minute_start(measure_pair_id)
-
-        title = self.generate_title(measure_pair_id)
-        filename = self.generate_filename(measure_pair_id)
-
-        export_path = os.path.join(self.export_folder_path, filename)
-
-        plotter = Plot(title, grav_data, seis_data, quite_minute, export_path)
-        plotter.run()
-
-    def run(self):
-        measure_pairs_ids = [x[0] for x in self.dbase.get_measure_pairs()]
-        for ti_id in measure_pairs_ids:
-            self.create_plot(ti_id)
+    def load_plot_inputs(self, measure_pair_ids: List[int],
+                         correction_type=SEIS_CORRECTION_TYPE
+                         ) -> Iterator[PlotInput]:
+        band = self.config.correction_band.name
+        margin_seconds = PLOT_MARGIN_MINUTES * 60
+        margin = timedelta(seconds=margin_seconds)
+        for i in range(0, len(measure_pair_ids), PLOT_BATCH_SIZE):
+            ids = measure_pair_ids[i:i + PLOT_BATCH_SIZE]
+            with span('load_plot_inputs'):
+                pairs_info = self.dbase.get_plot_pairs_info(ids)
+                grav_levels = self.dbase.get_grav_levels(ids, band)
+                minimal_energies = self.dbase.get_minimal_energies(ids, band)
+                minutes_records = split_records(
+                    self.dbase.get_grav_minute_records(ids, correction_type))
+                energy_records = split_records(
+                    self.dbase.get_seis_energy_records(ids, band))
+
+            for measure_pair_id, info, datetime_start, datetime_stop, \
+                    seis_file_path, tsf_file_path in pairs_info:
+                grav_level = grav_levels.get(measure_pair_id)
+                if not grav_level or measure_pair_id not in minimal_energies:
+                    continue
+                seis_level, quite_minute_index = \
+                    minimal_energies[measure_pair_id]
+                minutes = minutes_records.get(measure_pair_id,
+                                              np.empty((0, 5)))
+                energies = energy_records.get(measure_pair_id,
+                                              np.empty((0, 3)))
+                yield PlotInput(
+                    measure_pair_id, generate_title(info),
+                    generate_filename(info), datetime_start - margin,
+                    datetime_stop + margin, tsf_file_path, seis_file_path,
+                    grav_level, seis_level,
+                    quite_minute_index * 60 + margin_seconds,
+                    minutes[:, 1] + margin_seconds, minutes[:, 2],
+                    minutes[:, 3] != 0, minutes[:, 2] + minutes[:, 4],
+                    energies[:, 1] + margin_seconds, energies[:, 2])
+
+    def get_plot_fingerprint(self, plot_input: PlotInput,
+                             correction_type=SEIS_CORRECTION_TYPE) -> str:
+        source_files = []
+        for path in (plot_input.tsf_file_path, plot_input.seis_file_path):
+            if path is None:
+                source_files.append(MISSING_FILE_MARKER)
+                continue
+            stat = os.stat(path)
+            source_files.append((path, stat.st_mtime, stat.st_size))
+
+        return create_fingerprint(
+            PLOT_FINGERPRINT_VERSION, correction_type,
+            self.config.correction_band.name, *plot_input, *source_files)
+
+    def get_changed_plots(self, plot_inputs: Iterable[PlotInput],
+                          fingerprints: Dict[int, Union[str, None]],
+                          correction_type=SEIS_CORRECTION_TYPE,
+                          is_force=False) -> Iterator[PlotInput]:
+        saved_fingerprints = dict()
+        if not is_force:
+            saved_fingerprints = self.dbase.get_plot_fingerprints()
+
+        for plot_input in plot_inputs:
+            measure_pair_id = plot_input.measure_pair_id
+            try:
+                with span('fingerprint'):
+                    fingerprint = self.get_plot_fingerprint(plot_input,
+                                                            correction_type)
+            except (OSError, TypeError):
+                self.logger.exception('Fingerprint for measure pair '
+                                      f'{measure_pair_id} failed')
+                fingerprint = None
+
+            export_path = os.path.join(self.export_folder_path,
+                                       plot_input.filename)
+            if fingerprint is not None and os.path.exists(export_path) and \
+                    saved_fingerprints.get(measure_pair_id) == fingerprint:
+                count('plots_skipped')
+                continue
+            fingerprints[measure_pair_id] = fingerprint
+            yield plot_input
+
+    def read_plot_data(
+            self, plot_input: PlotInput) -> Tuple[GravityData, SeismicData]:
+        datetime_start = plot_input.datetime_start
+        datetime_stop = plot_input.datetime_stop
+        if plot_input.tsf_file_path is None:
+            raise OSError('TSF file for measure pair '
+                          f'{plot_input.measure_pair_id} not found')
+        with span('read_tsf'):
+            tsf_data = TSFile(plot_input.tsf_file_path)
+            seconds_arrays = tsf_data.read_signal(datetime_start,
+                                                  datetime_stop)
+
+        grav_data = GravityData(
+            plot_input.grav_quite_level, plot_input.minutes_times,
+            plot_input.src_minutes_values, plot_input.bad_minutes_mask,
+            plot_input.corr_minutes_values, *seconds_arrays)
+
+        seis_file_path = plot_input.seis_file_path
+        z_mean = self.channel_stats.get_mean(seis_file_path, 'Z')
+        with span('read_seismic'):
+            z_signal_arrays = read_z_signal(seis_file_path, datetime_start,
+                                            z_mean, datetime_stop)
+
+        seis_data = SeismicData(plot_input.seis_quite_level,
+                                plot_input.energy_times,
+                                plot_input.energy_values, *z_signal_arrays)
+        return grav_data, seis_data
+
+    @traced('create_plot')
+    def create_plot(self, plot_input: PlotInput):
+        grav_data, seis_data = self.read_plot_data(plot_input)
+        export_path = os.path.join(self.export_folder_path,
+                                   plot_input.filename)
+        with span('render'):
+            self.plot.render(plot_input.title, grav_data, seis_data,
+                             plot_input.quite_minute_seconds, export_path)
+
+    def try_create_plot(self, plot_input: PlotInput) -> Tuple[bool, str]:
+        try:
+            self.create_plot(plot_input)
+            return True, ''
+        except Exception as error:
+            self.logger.exception('Plot for measure pair '
+                                  f'{plot_input.measure_pair_id} failed')
+            return False, f'{type(error).__name__}: {error}'
+
+    def create_plots(self, plot_inputs: Iterable[PlotInput]
+                     ) -> Iterator[Tuple[int, bool, str]]:
+        for plot_input in plot_inputs:
+            is_created, error = self.try_create_plot(plot_input)
+            yield plot_input.measure_pair_id, is_created, error
+
+    def create_plots_parallel(self, plot_inputs: List[PlotInput],
+                              workers_count: int
+                              ) -> Iterator[Tuple[int, bool, str]]:
+        context = multiprocessing.get_context(WORKERS_START_METHOD)
+        with context.Pool(workers_count, initializer=init_plot_worker,
+                          initargs=(self.config.path,
+                                    RUN_TRACKER.enabled)) as pool:
+            for *result, report in pool.imap_unordered(
+                    create_plot_in_worker, plot_inputs):
+                RUN_TRACKER.merge(report)
+                yield tuple(result)
+
+    def run(self, correction_type=SEIS_CORRECTION_TYPE,
+            workers_count: Union[int, None] = None,
+            is_force=False) -> List[int]:
+        if correction_type not in {SEIS_CORRECTION_TYPE,
+                                   LEVEL_CORRECTION_TYPE}:
+            raise RuntimeError('Invalid setting correction type')
+
+        if workers_count is None:
+            workers_count = self.config.plot_workers_count
+        workers_count = max(workers_count, 1)
+
+        with run_report(self.config.export_root, 'plotting',
+                        self.config.is_cpu_profiling,
+                        self.config.is_memory_tracing):
+            measure_pairs_ids = [x[0] for x in
+                                 self.dbase.get_measure_pairs()]
+            fingerprints = dict()
+            plot_inputs = self.get_changed_plots(
+                self.load_plot_inputs(measure_pairs_ids, correction_type),
+                fingerprints, correction_type, is_force)
+            if workers_count > 1 and len(measure_pairs_ids) > 1:
+                results = self.create_plots_parallel(list(plot_inputs),
+                                                     workers_count)
+            else:
+                results = self.create_plots(plot_inputs)
+
+            failed_ids, created_fingerprints = [], dict()
+            for measure_pair_id, is_created, error in results:
+                if error:
+                    failed_ids.append(measure_pair_id)
+                    count('plots_failed')
+                elif is_created:
+                    count('plots_rendered')
+                    fingerprint = fingerprints[measure_pair_id]
+                    if fingerprint is not None:
+                        created_fingerprints[measure_pair_id] = fingerprint
+            self.dbase.add_plot_fingerprints(created_fingerprints)
+
+            if failed_ids:
+                self.logger.error(f'Plots for {len(failed_ids)} measure '
+                                  f'pairs failed: {sorted(failed_ids)}')
+        return failed_ids
+
+
+def init_plot_worker(config_file_path: str, is_tracking=False):
+    RUN_TRACKER.enabled = is_tracking
+    PLOT_WORKER_CONTEXT['plotting'] = Plotting(config_file_path,
+                                               is_read_only=True)
+
+
+def create_plot_in_worker(
+        plot_input: PlotInput) -> Tuple[int, bool, str, dict]:
+    plotting = PLOT_WORKER_CONTEXT['plotting']
+    RUN_TRACKER.reset()
+    is_created, error = plotting.try_create_plot(plot_input)
+    return plot_input.measure_pair_id, is_created, error, \
+        RUN_TRACKER.to_dict()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Correction result plots generation')
+    parser.add_argument('--config', required=True,
+                        help='path to project configuration file')
+    parser.add_argument('--correction-type', default=SEIS_CORRECTION_TYPE,
+                        choices=[SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of plotting processes (overrides '
+                             'plotting.workers from configuration)')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild plots with unchanged input data')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Plotting(args.config).run(args.correction_type, args.workers,
+                              args.force)
@@ -1,21 +1,35 @@
 import os
+import argparse
+import queue
+import threading
 from datetime import datetime
 from datetime import timedelta
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 import logging
 
 import numpy as np
-from seiscore import BinaryFile
 from seiscore.functions.spectrum import spectrum
 from seiscore.functions.energy import spectrum_energy
 
-from config import ConfigFile
+from config import ConfigFile, EnergyWindow, FrequencyBand
 from dbase import SqliteDbase
+from dbase import SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE
+from seismic_reader import ChunkedSignalReader, SignalBlock, iter_windows
+from seismic_reader import ChannelStatsCache
+from signal_cache import ResampledSignalCache, CACHE_FOLDER_NAME
+from instrumentation import count, run_report, span, traced
 
 
 EXPORT_CORRECTIONS_FOLDER_NAME = 'corrections'
-SEIS_CORRECTION_TYPE = 'seis'
-LEVEL_CORRECTION_TYPE = 'level'
+CHAIN_QUEUE_SIZE = 4
+CHAIN_QUEUE_TIMEOUT = 1
+COMPONENTS = ['X', 'Y', 'Z']
+TAPER_FUNCTIONS = {
+    'none': np.ones,
+    'hann': np.hanning,
+    'hamming': np.hamming,
+    'blackman': np.blackman
+}
 
 
 def get_intersection_time(grav_time: datetime, seis_time: datetime,
@@ -53,6 +67,51 @@ def get_level_correction(source_val: float, corrected_val: float,
     return round(new_val - source_val, 4)
 
 
+def get_taper(taper_type: str, size: int) -> np.ndarray:
+    if taper_type not in TAPER_FUNCTIONS:
+        raise RuntimeError(f'Invalid taper type - {taper_type}')
+    taper = TAPER_FUNCTIONS[taper_type](size)
+    return taper / np.sqrt(np.mean(taper ** 2))
+
+
+def get_window_energies(blocks: Iterable[SignalBlock], frequency: int,
+                        window: EnergyWindow,
+                        bands: List[FrequencyBand]) -> np.ndarray:
+    window_size = int(window.length * frequency)
+    hop_size = max(int(window.hop * frequency), 1)
+    if window_size == 0:
+        return np.zeros(shape=(0, len(bands)))
+
+    taper = get_taper(window.taper, window_size)
+    energies = []
+    for windows in iter_windows(blocks, window_size, hop_size):
+        count('ffts_computed', windows.shape[0])
+        for window_signal in windows:
+            spectrum_data = spectrum(window_signal * taper, frequency)
+            energies.append([spectrum_energy(spectrum_data,
+                                             (band.f_min, band.f_max))
+                             for band in bands])
+    if not energies:
+        return np.zeros(shape=(0, len(bands)))
+    return np.array(energies)
+
+
+def get_window_minute_indexes(windows_count: int, window: EnergyWindow,
+                              minutes_count: int,
+                              split_seconds=60) -> List[np.ndarray]:
+    centers = np.arange(windows_count) * window.hop + window.length / 2
+    minute_indexes = np.floor(centers / split_seconds).astype(int)
+
+    indexes = []
+    for i in range(minutes_count):
+        selection = np.nonzero(minute_indexes == i)[0]
+        if not selection.shape[0] and windows_count:
+            minute_center = (i + 0.5) * split_seconds
+            selection = np.array([np.argmin(abs(centers - minute_center))])
+        indexes.append(selection)
+    return indexes
+
+
 def format_correction_filename(
         datetime_val: datetime, gravimeter_short_number: str,
         seismometer_number: str) -> str:
@@ -67,7 +126,12 @@ class Processing:
             raise OSError
 
         self.config = ConfigFile(config_file_path)
-        self.dbase = SqliteDbase(self.config.export_root)
+        self.dbase = SqliteDbase(self.config.export_root,
+                                 self.config.slow_query_seconds)
+        self.channel_stats = ChannelStatsCache(self.dbase)
+        self.signal_cache = ResampledSignalCache(
+            os.path.join(self.config.export_root, CACHE_FOLDER_NAME),
+            self.config.signal_cache_size_mb, self.config.read_block_seconds)
         self.logger = logging.getLogger('Processing')
 
     @property
@@ -75,8 +139,15 @@ class Processing:
         return os.path.join(
             self.config.export_root, EXPORT_CORRECTIONS_FOLDER_NAME)
 
-    def add_measure_pair(self):
+    @traced('add_measure_pair')
+    def add_measure_pair(self, resume=False):
+        if resume and self.dbase.get_measure_pairs():
+            self.logger.debug('Measure pairs kept for resuming')
+            return
+
+        self.dbase.clear_corrections()
         self.dbase.clear_measure_pairs()
+        self.dbase.delete_all_energies()
         grav_seis_pairs = self.dbase.get_grav_seis_pairs()
         for grav_id, seis_id, *times in grav_seis_pairs:
             grav_dt_start, grav_dt_stop = times[:2]
@@ -92,32 +163,44 @@ class Processing:
 
     def get_energies(self, seis_file_path: str, datetime_min: datetime,
                      datetime_max: datetime,
-                     split_seconds=60) -> List[List[float]]:
+                     split_seconds=60) -> Dict[str, List[List[float]]]:
         self.logger.debug(f'Starting energy calculation for {seis_file_path}')
-        intervals_count = int(
+        minutes_count = int(
             (datetime_max - datetime_min).total_seconds() / split_seconds)
 
-        bin_data = BinaryFile(seis_file_path, use_avg_values=True)
-        f_min, f_max = self.config.get_bandpass_freqs()
-
-        energies = []
-        components = ['X', 'Y', 'Z']
-        for i in range(intervals_count):
-            left_datetime = datetime_min + timedelta(seconds=split_seconds * i)
-            right_datetime = left_datetime + timedelta(seconds=split_seconds)
-
-            bin_data.read_date_time_start = left_datetime
-            bin_data.read_date_time_stop = right_datetime
-
-            component_energy = []
-            for component in components:
-                signal = bin_data.read_signal(component)
-                spectrum_data = spectrum(signal, bin_data.resample_frequency)
-                energy_val = spectrum_energy(spectrum_data, (f_min, f_max))
-                component_energy.append(energy_val)
-            full_energy = (sum((x ** 2 for x in component_energy))) ** 0.5
-            all_energies = component_energy + [full_energy]
-            energies.append(all_energies)
+        datetime_max = datetime_min + timedelta(
+            seconds=split_seconds * minutes_count)
+
+        bands = self.config.frequency_bands
+        window = self.config.energy_window
+
+        channel_stats = self.channel_stats.get(seis_file_path)
+        component_energies = []
+        for component in COMPONENTS:
+            reader = ChunkedSignalReader(
+                seis_file_path, component,
+                block_seconds=self.config.read_block_seconds,
+                resample_frequency=self.config.resample_frequency,
+                mean=channel_stats[component].mean,
+                cache=self.signal_cache)
+            blocks = reader.read_blocks(datetime_min, datetime_max)
+            with span(f'energies_{component}'):
+                component_energies.append(get_window_energies(
+                    blocks, reader.frequency, window, bands))
+        windows_count = min((x.shape[0] for x in component_energies))
+        minute_windows = get_window_minute_indexes(
+            windows_count, window, minutes_count, split_seconds)
+
+        energies = {x.name: [] for x in bands}
+        if not windows_count:
+            return energies
+
+        for selection in minute_windows:
+            for j, band in enumerate(bands):
+                band_energy = [float(np.mean(x[selection, j]))
+                               for x in component_energies]
+                full_energy = (sum((x ** 2 for x in band_energy))) ** 0.5
+                energies[band.name].append(band_energy + [full_energy])
 
         self.logger.debug(f'Energy calculation for {seis_file_path} finished')
         return energies
@@ -130,44 +213,30 @@ class Processing:
             medians.append(float(np.median(enegry_vals)))
         return medians
 
-    def save_energies(self):
-        self.dbase.delete_all_energies()
-        records = self.dbase.get_measure_pairs()
-        for i, record in enumerate(records):
-            pair_id, seis_file_id = record[0], record[2]
-            min_datetime, max_datetime = record[3:5]
-            filepath = self.dbase.get_seis_file_path_by_id(seis_file_id)
-            energies = self.get_energies(filepath, min_datetime,
-                                         max_datetime)
-            median_energies = self.get_median_energies(energies)
-
-            self.dbase.add_energies(pair_id, energies)
-            self.dbase.add_median_energies(pair_id, median_energies)
-
-            self.logger.debug(f'Remain - {len(records) - i - 1} files')
-
-    def add_seis_corrections(self):
-        self.dbase.clear_corrections()
-        corrections = {}
-        for record in self.dbase.get_pre_correction_data():
-            time_intersection_id, grav_measure_id = record[:2]
-            grav_level, measure_val, energy_ratio = record[2:]
-
-            amplitude = grav_level - measure_val
-            seis_correction = get_seis_correction(amplitude, energy_ratio)
-
-            vals = corrections.get(time_intersection_id, [])
-            vals.append((grav_measure_id, seis_correction))
-
-            corrections[time_intersection_id] = vals
-
-        for ti_id, vals in corrections.items():
-            self.dbase.add_seis_corrections(ti_id, vals)
-
-    def add_level_corrections(self):
-        self.dbase.clear_corrections()
+    @traced('save_pair_energies')
+    def save_pair_energies(self, record: Tuple[int, int, int, datetime,
+                                               datetime]):
+        pair_id, seis_file_id = record[0], record[2]
+        min_datetime, max_datetime = record[3:5]
+        filepath = self.dbase.get_seis_file_path_by_id(seis_file_id)
+        band_energies = self.get_energies(filepath, min_datetime,
+                                          max_datetime)
+
+        energies, median_energies = {}, {}
+        for band_name, band_vals in band_energies.items():
+            if not band_vals:
+                continue
+            energies[band_name] = band_vals
+            median_energies[band_name] = self.get_median_energies(band_vals)
+        self.dbase.save_pair_energies(pair_id, energies, median_energies)
+
+    @traced('add_corrections')
+    def add_corrections(self, measure_pair_ids: List[int] = None):
+        self.dbase.clear_corrections(measure_pair_ids)
         corrections = {}
-        for record in self.dbase.get_pre_correction_data():
+        band = self.config.correction_band
+        for record in self.dbase.get_pre_correction_data(band.name,
+                                                         measure_pair_ids):
             time_intersection_id, grav_measure_id = record[:2]
             grav_level, measure_val, energy_ratio = record[2:]
 
@@ -179,16 +248,18 @@ class Processing:
                 measure_val, corrected_val, grav_level)
 
             vals = corrections.get(time_intersection_id, [])
-            vals.append((grav_measure_id, level_correction))
+            vals.append((grav_measure_id, seis_correction, level_correction))
 
             corrections[time_intersection_id] = vals
 
         for ti_id, vals in corrections.items():
-            self.dbase.add_seis_corrections(ti_id, vals)
+            self.dbase.add_corrections(ti_id, vals)
 
     def get_link_corrections(
             self, chain_id: int, link_id: int, gravimeter_id: int,
-            seismometer_id: int) -> List[Tuple[int, int, int, float]]:
+            seismometer_id: int,
+            correction_type=SEIS_CORRECTION_TYPE
+    ) -> List[Tuple[int, int, int, float]]:
         is_pair_exists = self.dbase.is_sensor_pair_exists(
             chain_id, link_id, gravimeter_id, seismometer_id)
 
@@ -202,15 +273,17 @@ class Processing:
                 corrections_list.append((link_index, i + 1, is_bad, 0))
         else:
             records = self.dbase.get_post_corrections_by_params(
-                chain_id, link_id, gravimeter_id, seismometer_id)
+                chain_id, link_id, gravimeter_id, seismometer_id,
+                correction_type)
             for cycle_index, is_bad, correction_value in records:
                 corrections_list.append(
                     (link_index, cycle_index, is_bad, correction_value))
         return corrections_list
 
     def get_chain_corrections(
-            self, chain_id: int, gravimeter_id: int,
-            seismometer_id: int) -> List[Tuple[int, int, int, float]]:
+            self, chain_id: int, gravimeter_id: int, seismometer_id: int,
+            correction_type=SEIS_CORRECTION_TYPE
+    ) -> List[Tuple[int, int, int, float]]:
         if not self.dbase.is_chain_has_corrections(
                 chain_id, gravimeter_id, seismometer_id):
             return []
@@ -219,7 +292,8 @@ class Processing:
         corrections_list = []
         for link_id in link_ids:
             link_corrections = self.get_link_corrections(
-                chain_id, link_id, gravimeter_id, seismometer_id)
+                chain_id, link_id, gravimeter_id, seismometer_id,
+                correction_type)
             corrections_list += link_corrections
         return corrections_list
 
@@ -236,7 +310,13 @@ class Processing:
                 line = '\t'.join((str(x) for x in record)) + '\r\n'
                 file_ctx.write(line)
 
-    def export_corrections(self, chain_ids: List[int] = []):
+    @traced('export_corrections')
+    def export_corrections(self, chain_ids: List[int] = [],
+                           correction_type=SEIS_CORRECTION_TYPE):
+        if correction_type not in {SEIS_CORRECTION_TYPE,
+                                   LEVEL_CORRECTION_TYPE}:
+            raise RuntimeError('Invalid setting correction type')
+
         if not chain_ids:
             chain_ids = self.dbase.get_all_chain_ids()
 
@@ -244,7 +324,8 @@ class Processing:
             sensor_pairs = self.dbase.get_device_pairs_by_chain_id(chain_id_val)
             for gravimeter_id, seismometer_id in sensor_pairs:
                 chain_corrections = self.get_chain_corrections(
-                    chain_id_val, gravimeter_id, seismometer_id
+                    chain_id_val, gravimeter_id, seismometer_id,
+                    correction_type
                 )
 
                 if not chain_corrections:
@@ -271,25 +352,120 @@ class Processing:
                     chain_id_val)
                 self.save_corrections(export_folder, correction_filename,
                                       chain_corrections)
-
-    def recalc_corrections(self, correction_type=SEIS_CORRECTION_TYPE):
-        if correction_type not in {SEIS_CORRECTION_TYPE,
-                                   LEVEL_CORRECTION_TYPE}:
-            raise RuntimeError('Invalid setting correction type')
-
-        self.save_energies()
-        if correction_type == SEIS_CORRECTION_TYPE:
-            self.add_seis_corrections()
-        elif correction_type == LEVEL_CORRECTION_TYPE:
-            self.add_level_corrections()
+                count('correction_files_exported')
+
+    @traced('export_chain')
+    def export_chain(self, chain_id: int,
+                     correction_type=SEIS_CORRECTION_TYPE):
+        measure_pair_ids = [
+            x[0] for x in self.dbase.get_measure_pairs_by_chain_id(chain_id)]
+        self.add_corrections(measure_pair_ids)
+        self.export_corrections([chain_id], correction_type)
+        self.logger.debug(f'Corrections for chain {chain_id} exported')
+
+    @traced('run_pipeline')
+    def run_pipeline(self, chain_queue: queue.Queue,
+                     exporter: threading.Thread, resume=False):
+        if resume:
+            self.dbase.delete_incomplete_energies()
+            completed_ids = self.dbase.get_completed_measure_pair_ids()
         else:
-            pass
-
-    def run(self, correction_type=SEIS_CORRECTION_TYPE):
+            self.dbase.delete_all_energies()
+            completed_ids = set()
+
+        chained_ids = set()
+        for chain_id in self.dbase.get_all_chain_ids():
+            records = self.dbase.get_measure_pairs_by_chain_id(chain_id)
+            chained_ids.update((x[0] for x in records))
+            for record in records:
+                if record[0] in completed_ids:
+                    continue
+                self.save_pair_energies(record)
+                completed_ids.add(record[0])
+            if records and not put_chain(chain_queue, chain_id, exporter):
+                raise RuntimeError('Corrections export worker stopped')
+
+        unchained_ids = []
+        for record in self.dbase.get_measure_pairs():
+            if record[0] not in chained_ids:
+                unchained_ids.append(record[0])
+            if record[0] in completed_ids:
+                continue
+            self.save_pair_energies(record)
+            completed_ids.add(record[0])
+        if unchained_ids:
+            self.add_corrections(unchained_ids)
+
+    def run(self, correction_type=SEIS_CORRECTION_TYPE, resume=False):
         if correction_type not in {SEIS_CORRECTION_TYPE,
                                    LEVEL_CORRECTION_TYPE}:
             raise RuntimeError('Invalid setting correction type')
 
-        self.add_measure_pair()
-        self.recalc_corrections()
-        self.export_corrections()
+        with run_report(self.config.export_root, 'processing',
+                        self.config.is_cpu_profiling,
+                        self.config.is_memory_tracing):
+            self.add_measure_pair(resume)
+            self.dbase.enable_concurrent_access()
+
+            chain_queue = queue.Queue(maxsize=CHAIN_QUEUE_SIZE)
+            errors = []
+            exporter = threading.Thread(
+                target=export_chains_worker,
+                args=(self.config.path, chain_queue, correction_type,
+                      errors))
+            exporter.start()
+            try:
+                self.run_pipeline(chain_queue, exporter, resume)
+            finally:
+                put_chain(chain_queue, None, exporter)
+                exporter.join()
+                if errors:
+                    raise errors[0]
+
+
+def put_chain(chain_queue: queue.Queue, chain_id: Union[int, None],
+              exporter: threading.Thread) -> bool:
+    while True:
+        try:
+            chain_queue.put(chain_id, timeout=CHAIN_QUEUE_TIMEOUT)
+            return True
+        except queue.Full:
+            if not exporter.is_alive():
+                return False
+
+
+def export_chains_worker(config_file_path: str, chain_queue: queue.Queue,
+                         correction_type=SEIS_CORRECTION_TYPE,
+                         errors: Union[List[Exception], None] = None):
+    logger = logging.getLogger('Processing')
+    try:
+        processing = Processing(config_file_path)
+        while True:
+            chain_id = chain_queue.get()
+            if chain_id is None:
+                break
+            try:
+                processing.export_chain(chain_id, correction_type)
+            except Exception:
+                processing.logger.exception(
+                    f'Corrections export for chain {chain_id} failed')
+    except Exception as error:
+        logger.exception('Corrections export worker failed')
+        if errors is not None:
+            errors.append(error)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Seismic corrections calculation')
+    parser.add_argument('--config', required=True,
+                        help='path to project configuration file')
+    parser.add_argument('--correction-type', default=SEIS_CORRECTION_TYPE,
+                        choices=[SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE])
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the first incomplete measure '
+                             'pair instead of full recomputing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    Processing(args.config).run(args.correction_type, args.resume)
@@ -0,0 +1,266 @@
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterator, List, Tuple, Union
+import argparse
+import html
+import logging
+import os
+
+import numpy as np
+from PIL import Image
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+
+from dbase import SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE
+from plotting import Plotting, PlotInput, PLOT_DPI
+from instrumentation import count, run_report, span
+
+
+PDF_FORMAT = 'pdf'
+HTML_FORMAT = 'html'
+REPORT_FILENAME = 'report'
+SUMMARY_ROWS_PER_PAGE = 40
+THUMBNAIL_WIDTH = 360
+THUMBNAILS_FOLDER_NAME = 'thumbnails'
+SUMMARY_COLUMNS = ['Пара', 'Начало', 'Окончание', 'Минут', 'Забраковано',
+                   'Тихий уровень, мГал', 'Макс. поправка, мГал',
+                   'Мин. энергия Z']
+
+HTML_HEADER = '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n' \
+              '<title>{title}</title>\n<style>\n' \
+              'body {{font-family: "Times New Roman", serif;}}\n' \
+              'table {{border-collapse: collapse; margin-bottom: 12px;}}\n' \
+              'th, td {{border: 1px solid #999; padding: 2px 6px;}}\n' \
+              '.thumbnails img {{margin: 4px; border: 1px solid #ccc;}}\n' \
+              '</style>\n</head>\n<body>\n<h1>{title}</h1>\n'
+HTML_FOOTER = '</body>\n</html>\n'
+
+
+PairGroup = Tuple[Tuple[str, str],
+                  List[Tuple[int, str, str, datetime, datetime]]]
+
+
+def get_html_link(path: str, folder: str) -> str:
+    link = os.path.relpath(path, folder).replace(os.sep, '/')
+    return html.escape(link, quote=True)
+
+
+def format_float(value: Union[float, None], digits: int) -> str:
+    if value is None:
+        return '-'
+    return f'{value:.{digits}f}'
+
+
+def create_summary_row(pair_info: Tuple[int, str, str, datetime, datetime],
+                       plot_input: Union[PlotInput, None]) -> List[str]:
+    measure_pair_id, _, _, datetime_start, datetime_stop = pair_info
+    row = [str(measure_pair_id), datetime_start.strftime('%H:%M:%S'),
+           datetime_stop.strftime('%H:%M:%S')]
+    if plot_input is None:
+        return row + ['-'] * (len(SUMMARY_COLUMNS) - len(row))
+
+    corrections = plot_input.corr_minutes_values - \
+        plot_input.src_minutes_values
+    max_correction = float(np.max(np.abs(corrections))) \
+        if corrections.shape[0] else None
+    return row + [str(plot_input.minutes_times.shape[0]),
+                  str(int(np.sum(plot_input.bad_minutes_mask))),
+                  format_float(plot_input.grav_quite_level, 4),
+                  format_float(max_correction, 4),
+                  format_float(plot_input.seis_quite_level, 0)]
+
+
+def create_thumbnail(image_path: str, thumbnail_path: str):
+    with Image.open(image_path) as image:
+        image.thumbnail((THUMBNAIL_WIDTH, image.height))
+        image.save(thumbnail_path)
+
+
+def is_thumbnail_actual(image_path: str, thumbnail_path: str) -> bool:
+    return os.path.exists(thumbnail_path) and \
+        os.path.getmtime(thumbnail_path) >= os.path.getmtime(image_path)
+
+
+def create_summary_figure(title: str, rows: List[List[str]]) -> Figure:
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    fig.set_size_inches(12, 16)
+    fig.dpi = PLOT_DPI
+    fig.suptitle(title, fontname='Times New Roman', fontsize=16)
+
+    axes = fig.subplots(1, 1)
+    axes.axis('off')
+    table = axes.table(cellText=rows, colLabels=SUMMARY_COLUMNS,
+                       loc='upper center', cellLoc='center')
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    table.auto_set_column_width(list(range(len(SUMMARY_COLUMNS))))
+    table.scale(1, 1.4)
+    return fig
+
+
+class SeasonReport:
+    def __init__(self, config_file_path: str,
+                 correction_type=SEIS_CORRECTION_TYPE):
+        if correction_type not in {SEIS_CORRECTION_TYPE,
+                                   LEVEL_CORRECTION_TYPE}:
+            raise RuntimeError('Invalid setting correction type')
+        self.plotting = Plotting(config_file_path)
+        self.config = self.plotting.config
+        self.dbase = self.plotting.dbase
+        self.correction_type = correction_type
+        self.logger = logging.getLogger('SeasonReport')
+
+    def get_default_path(self, report_format: str) -> str:
+        return os.path.join(self.config.export_root,
+                            f'{REPORT_FILENAME}.{report_format}')
+
+    def get_groups(self) -> Iterator[PairGroup]:
+        pairs = self.dbase.get_measure_pair_groups()
+        for key, group in groupby(pairs, key=lambda x: (x[1], x[2])):
+            yield key, list(group)
+
+    def load_group_inputs(
+            self, group: List[Tuple[int, str, str, datetime, datetime]]
+    ) -> Dict[int, PlotInput]:
+        ids = [x[0] for x in group]
+        return {x.measure_pair_id: x for x in
+                self.plotting.load_plot_inputs(ids, self.correction_type)}
+
+    def get_group_title(self, station: str, date_str: str) -> str:
+        date_val = datetime.strptime(date_str, '%Y-%m-%d')
+        return f'Пункт № {station}, дата {date_val.strftime("%d.%m.%Y")}'
+
+    def write_pdf_group(self, pdf: PdfPages, title: str,
+                        group: List[Tuple[int, str, str, datetime, datetime]],
+                        plot_inputs: Dict[int, PlotInput]):
+        rows = [create_summary_row(x, plot_inputs.get(x[0])) for x in group]
+        for i in range(0, len(rows), SUMMARY_ROWS_PER_PAGE):
+            fig = create_summary_figure(
+                title, rows[i:i + SUMMARY_ROWS_PER_PAGE])
+            pdf.savefig(fig)
+            fig.clear()
+            count('report_pages')
+
+        for pair_info in group:
+            plot_input = plot_inputs.get(pair_info[0])
+            if plot_input is None:
+                continue
+            try:
+                with span('read_plot_data'):
+                    grav_data, seis_data = self.plotting.read_plot_data(
+                        plot_input)
+                with span('render'):
+                    self.plotting.plot.draw(
+                        plot_input.title, grav_data, seis_data,
+                        plot_input.quite_minute_seconds)
+                    pdf.savefig(self.plotting.plot.figure)
+                count('report_pages')
+            except Exception:
+                self.logger.exception('Report page for measure pair '
+                                      f'{pair_info[0]} failed')
+                count('report_pages_failed')
+
+    def write_pdf(self, path: str):
+        with PdfPages(path) as pdf:
+            for (station, date_str), group in self.get_groups():
+                plot_inputs = self.load_group_inputs(group)
+                self.write_pdf_group(pdf, self.get_group_title(
+                    station, date_str), group, plot_inputs)
+                count('report_groups')
+
+            info = pdf.infodict()
+            info['Title'] = 'Season report'
+            info['CreationDate'] = datetime.now()
+
+    def write_html_group(self, file_ctx, folder: str, title: str,
+                         group: List[Tuple[int, str, str, datetime,
+                                           datetime]],
+                         plot_inputs: Dict[int, PlotInput]):
+        file_ctx.write(f'<h2>{html.escape(title)}</h2>\n<table>\n<tr>')
+        file_ctx.write(''.join((f'<th>{html.escape(x)}</th>'
+                                for x in SUMMARY_COLUMNS)))
+        file_ctx.write('</tr>\n')
+        for pair_info in group:
+            row = create_summary_row(pair_info, plot_inputs.get(pair_info[0]))
+            file_ctx.write('<tr>' + ''.join(
+                (f'<td>{html.escape(x)}</td>' for x in row)) + '</tr>\n')
+        file_ctx.write('</table>\n<div class="thumbnails">\n')
+
+        for pair_info in group:
+            plot_input = plot_inputs.get(pair_info[0])
+            if plot_input is None:
+                continue
+            image_path = os.path.join(self.plotting.export_folder_path,
+                                      plot_input.filename)
+            if not os.path.exists(image_path):
+                is_created, _ = self.plotting.try_create_plot(plot_input)
+                if not is_created:
+                    count('report_pages_failed')
+                    continue
+            thumbnail_path = os.path.join(folder, THUMBNAILS_FOLDER_NAME,
+                                          plot_input.filename)
+            if not is_thumbnail_actual(image_path, thumbnail_path):
+                with span('thumbnail'):
+                    create_thumbnail(image_path, thumbnail_path)
+            link = get_html_link(image_path, folder)
+            thumbnail_link = get_html_link(thumbnail_path, folder)
+            file_ctx.write(
+                f'<a href="{link}"><img src="{thumbnail_link}" '
+                f'loading="lazy" width="{THUMBNAIL_WIDTH}" '
+                f'alt="{html.escape(plot_input.title, quote=True)}"></a>\n')
+            count('report_pages')
+        file_ctx.write('</div>\n')
+
+    def write_html(self, path: str):
+        folder = os.path.dirname(os.path.abspath(path))
+        thumbnails_folder = os.path.join(folder, THUMBNAILS_FOLDER_NAME)
+        if not os.path.exists(thumbnails_folder):
+            os.makedirs(thumbnails_folder)
+        with open(path, 'w', encoding='utf-8') as file_ctx:
+            file_ctx.write(HTML_HEADER.format(title='Отчет по сезону'))
+            for (station, date_str), group in self.get_groups():
+                plot_inputs = self.load_group_inputs(group)
+                self.write_html_group(
+                    file_ctx, folder, self.get_group_title(station, date_str),
+                    group, plot_inputs)
+                file_ctx.flush()
+                count('report_groups')
+            file_ctx.write(HTML_FOOTER)
+
+    def run(self, report_format=PDF_FORMAT,
+            path: Union[str, None] = None) -> str:
+        if report_format not in {PDF_FORMAT, HTML_FORMAT}:
+            raise RuntimeError('Invalid report format')
+        if not path:
+            path = self.get_default_path(report_format)
+
+        with run_report(self.config.export_root, 'report',
+                        self.config.is_cpu_profiling,
+                        self.config.is_memory_tracing):
+            if report_format == PDF_FORMAT:
+                self.write_pdf(path)
+            else:
+                self.write_html(path)
+        self.logger.info(f'Report saved to {path}')
+        return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Season report with correction result plots')
+    parser.add_argument('--config', required=True,
+                        help='path to project configuration file')
+    parser.add_argument('--format', default=PDF_FORMAT,
+                        choices=[PDF_FORMAT, HTML_FORMAT])
+    parser.add_argument('--output', default='',
+                        help=f'report file path (by default '
+                             f'{REPORT_FILENAME}.<format> in export root)')
+    parser.add_argument('--correction-type', default=SEIS_CORRECTION_TYPE,
+                        choices=[SEIS_CORRECTION_TYPE, LEVEL_CORRECTION_TYPE])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    SeasonReport(args.config, args.correction_type).run(args.format,
+                                                        args.output)
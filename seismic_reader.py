@@ -0,0 +1,290 @@
+import os
+from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, Iterable, NamedTuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from seiscore import BinaryFile
+
+from dbase import SqliteDbase
+from signal_cache import ResampledSignalCache
+from instrumentation import count
+
+
+DEFAULT_BLOCK_SECONDS = 600
+
+HEADER_BASE_SIZE = 120
+HEADER_CHANNEL_SIZE = 72
+CHANNELS_COUNT_OFFSETS = {'00': 0, 'xx': 0, 'bin': 12}
+SAMPLE_DTYPE = np.int32
+COMPONENT_INDEXES = {'X': 0, 'Y': 1, 'Z': 2}
+COMPONENTS = ['X', 'Y', 'Z']
+RAW_FILES_CACHE_SIZE = 32
+
+
+class SignalBlock(NamedTuple):
+    datetime_start: datetime
+    frequency: int
+    signal: np.ndarray
+
+
+class ChannelStats(NamedTuple):
+    mean: float
+    min: float
+    max: float
+    rms: float
+
+
+def iter_windows(blocks: Iterable[SignalBlock], window_size: int,
+                 hop_size: int) -> Iterator[np.ndarray]:
+    buffer = np.zeros(shape=0)
+    skip_size = 0
+    for block in blocks:
+        signal = block.signal[skip_size:]
+        skip_size -= block.signal.shape[0] - signal.shape[0]
+        buffer = np.concatenate((buffer, signal))
+        if buffer.shape[0] < window_size:
+            continue
+
+        windows = sliding_window_view(buffer, window_size)[::hop_size]
+        yield windows
+        consumed_size = windows.shape[0] * hop_size
+        skip_size = max(consumed_size - buffer.shape[0], 0)
+        buffer = buffer[consumed_size:]
+
+
+def get_extension(path: str) -> str:
+    return os.path.basename(path).split('.')[-1]
+
+
+def is_raw_access_supported(path: str) -> bool:
+    return get_extension(path) in CHANNELS_COUNT_OFFSETS
+
+
+def read_channels_count(path: str) -> int:
+    offset = CHANNELS_COUNT_OFFSETS[get_extension(path)]
+    with open(path, 'rb') as file_ctx:
+        file_ctx.seek(offset)
+        return int(np.frombuffer(file_ctx.read(2), dtype=np.uint16)[0])
+
+
+class RawSeismicFile:
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise OSError(f'File not found - {path}')
+
+        if not is_raw_access_supported(path):
+            raise OSError(f'File {path} has no raw access support')
+
+        bin_data = BinaryFile(path)
+        self.path = path
+        self.datetime_start = bin_data.datetime_start
+        self.frequency = bin_data.resample_frequency
+        self.channels_count = read_channels_count(path)
+        self.__data = self.__map_data()
+
+    @property
+    def header_size(self) -> int:
+        return HEADER_BASE_SIZE + HEADER_CHANNEL_SIZE * self.channels_count
+
+    @property
+    def samples_count(self) -> int:
+        return self.__data.shape[0]
+
+    @property
+    def datetime_stop(self) -> datetime:
+        return self.datetime_start + timedelta(
+            seconds=self.samples_count / self.frequency)
+
+    def __map_data(self) -> np.ndarray:
+        data = np.memmap(self.path, dtype=SAMPLE_DTYPE, mode='r',
+                         offset=self.header_size)
+        samples_count = data.shape[0] // self.channels_count
+        return data[:samples_count * self.channels_count].reshape(
+            samples_count, self.channels_count)
+
+    def get_channel(self, component: str) -> np.ndarray:
+        return self.__data[:, COMPONENT_INDEXES[component]]
+
+    def get_index(self, datetime_val: datetime) -> int:
+        seconds = (datetime_val - self.datetime_start).total_seconds()
+        index = int(round(seconds * self.frequency))
+        return min(max(index, 0), self.samples_count)
+
+    def read_by_index(self, component: str, index_start: int,
+                      index_stop: int) -> np.ndarray:
+        return self.get_channel(component)[index_start:index_stop]
+
+    def read_by_time(self, component: str, datetime_start: datetime,
+                     datetime_stop: datetime) -> np.ndarray:
+        return self.read_by_index(component, self.get_index(datetime_start),
+                                  self.get_index(datetime_stop))
+
+
+@lru_cache(maxsize=RAW_FILES_CACHE_SIZE)
+def open_raw_file_version(path: str, mtime: float,
+                          size: int) -> RawSeismicFile:
+    return RawSeismicFile(path)
+
+
+def open_raw_file(path: str) -> RawSeismicFile:
+    stat = os.stat(path)
+    return open_raw_file_version(path, stat.st_mtime, stat.st_size)
+
+
+class ChunkedSignalReader:
+    def __init__(self, path: str, component: str,
+                 block_seconds=DEFAULT_BLOCK_SECONDS, resample_frequency=0,
+                 remove_mean=True, mean: Union[float, None] = None,
+                 cache: Union[ResampledSignalCache, None] = None):
+        self.path = path
+        self.component = component
+        self.block_seconds = block_seconds
+        self.remove_mean = remove_mean
+        self.fixed_mean = mean
+        self.__cached_signal = None
+        if not resample_frequency and is_raw_access_supported(path):
+            self.__source = open_raw_file(path)
+            self.__bin_data = None
+        else:
+            self.__source = BinaryFile(path,
+                                       resample_frequency=resample_frequency)
+            self.__bin_data = self.__source
+            if resample_frequency and cache is not None:
+                self.__cached_signal = cache.read_signal(
+                    path, component, resample_frequency)
+        self.__mean = 0.
+        self.__samples_count = 0
+
+    @property
+    def frequency(self) -> int:
+        if self.__bin_data is None:
+            return self.__source.frequency
+        return self.__bin_data.resample_frequency
+
+    @property
+    def datetime_start(self) -> datetime:
+        return self.__source.datetime_start
+
+    @property
+    def datetime_stop(self) -> datetime:
+        return self.__source.datetime_stop
+
+    @property
+    def mean(self) -> float:
+        return self.__mean
+
+    def reset_mean(self):
+        self.__mean = 0.
+        self.__samples_count = 0
+
+    def update_mean(self, signal: np.ndarray) -> float:
+        count = signal.shape[0]
+        if not count:
+            return self.__mean
+
+        self.__samples_count += count
+        self.__mean += (np.sum(signal) - count * self.__mean) / \
+            self.__samples_count
+        return self.__mean
+
+    def read_blocks(
+            self, datetime_start: Union[datetime, None] = None,
+            datetime_stop: Union[datetime, None] = None
+    ) -> Iterator[SignalBlock]:
+        if datetime_start is None or datetime_start < self.datetime_start:
+            datetime_start = self.datetime_start
+        if datetime_stop is None or datetime_stop > self.datetime_stop:
+            datetime_stop = self.datetime_stop
+
+        self.reset_mean()
+        block_start = datetime_start
+        while block_start < datetime_stop:
+            block_stop = min(
+                block_start + timedelta(seconds=self.block_seconds),
+                datetime_stop)
+
+            signal = self.__read_block(block_start, block_stop)
+            count('seismic_samples_read', signal.shape[0])
+            if self.remove_mean and self.fixed_mean is not None:
+                signal -= self.fixed_mean
+            elif self.remove_mean:
+                signal -= self.update_mean(signal)
+
+            yield SignalBlock(block_start, self.frequency, signal)
+            block_start = block_stop
+
+    def __read_block(self, datetime_start: datetime,
+                     datetime_stop: datetime) -> np.ndarray:
+        if self.__bin_data is None:
+            signal = self.__source.read_by_time(self.component,
+                                                datetime_start, datetime_stop)
+            return signal.astype(np.float64)
+
+        if self.__cached_signal is not None:
+            index_start = self.__get_cached_index(datetime_start)
+            index_stop = self.__get_cached_index(datetime_stop)
+            signal = self.__cached_signal[index_start:index_stop]
+            return signal.astype(np.float64)
+
+        self.__bin_data.read_date_time_start = datetime_start
+        self.__bin_data.read_date_time_stop = datetime_stop
+        return self.__bin_data.read_signal(self.component).astype(np.float64)
+
+    def __get_cached_index(self, datetime_val: datetime) -> int:
+        seconds = (datetime_val - self.datetime_start).total_seconds()
+        index = int(round(seconds * self.frequency))
+        return min(max(index, 0), self.__cached_signal.shape[0])
+
+    def read(self, datetime_start: Union[datetime, None] = None,
+             datetime_stop: Union[datetime, None] = None) -> np.ndarray:
+        blocks = [x.signal for x in
+                  self.read_blocks(datetime_start, datetime_stop)]
+        if not blocks:
+            return np.zeros(shape=0)
+        return np.concatenate(blocks)
+
+
+def compute_channel_stats(path: str, component: str,
+                          block_seconds=DEFAULT_BLOCK_SECONDS) -> ChannelStats:
+    reader = ChunkedSignalReader(path, component, block_seconds,
+                                 remove_mean=False)
+    count, total, squares_total = 0, 0., 0.
+    min_val, max_val = np.inf, -np.inf
+    for block in reader.read_blocks():
+        if not block.signal.shape[0]:
+            continue
+        count += block.signal.shape[0]
+        total += float(np.sum(block.signal))
+        squares_total += float(np.sum(block.signal ** 2))
+        min_val = min(min_val, float(np.min(block.signal)))
+        max_val = max(max_val, float(np.max(block.signal)))
+
+    if not count:
+        return ChannelStats(0., 0., 0., 0.)
+    return ChannelStats(total / count, min_val, max_val,
+                        (squares_total / count) ** 0.5)
+
+
+class ChannelStatsCache:
+    def __init__(self, dbase: SqliteDbase):
+        self.dbase = dbase
+
+    def get(self, path: str) -> Dict[str, ChannelStats]:
+        mtime = os.path.getmtime(path)
+        records = self.dbase.get_seis_channel_stats(path, mtime)
+        stats = {x: ChannelStats(*y) for x, y in records.items()}
+        for component in COMPONENTS:
+            if component in stats:
+                continue
+            stats[component] = compute_channel_stats(path, component)
+            if self.dbase.is_read_only:
+                continue
+            self.dbase.add_seis_channel_stats(path, mtime, component,
+                                              stats[component])
+        return stats
+
+    def get_mean(self, path: str, component: str) -> float:
+        return self.get(path)[component].mean
@@ -0,0 +1,143 @@
+import os
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Union
+
+import numpy as np
+from numpy.lib.format import open_memmap
+from seiscore import BinaryFile
+
+
+CACHE_FOLDER_NAME = '.signal_cache'
+CACHE_EXTENSION = 'npy'
+DEFAULT_CACHE_SIZE_MB = 2048
+DEFAULT_BLOCK_SECONDS = 600
+
+
+def get_cache_key(path: str, component: str, frequency: int,
+                  mtime: float) -> str:
+    src = f'{os.path.abspath(path)}|{component}|{frequency}|{mtime}'
+    return hashlib.sha1(src.encode()).hexdigest()
+
+
+class ResampledSignalCache:
+    def __init__(self, root: str, max_size_mb=DEFAULT_CACHE_SIZE_MB,
+                 block_seconds=DEFAULT_BLOCK_SECONDS):
+        self.root = root
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.block_seconds = block_seconds
+        self.logger = logging.getLogger('SignalCache')
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    def get_cache_path(self, path: str, component: str,
+                       frequency: int) -> str:
+        key = get_cache_key(path, component, frequency,
+                            os.path.getmtime(path))
+        return os.path.join(self.root, f'{key}.{CACHE_EXTENSION}')
+
+    def get(self, path: str, component: str,
+            frequency: int) -> Union[np.ndarray, None]:
+        cache_path = self.get_cache_path(path, component, frequency)
+        if not os.path.exists(cache_path):
+            return None
+
+        os.utime(cache_path)
+        return np.load(cache_path, mmap_mode='r')
+
+    def get_tmp_path(self, cache_path: str) -> str:
+        return f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    def put(self, path: str, component: str, frequency: int,
+            signal: np.ndarray):
+        cache_path = self.get_cache_path(path, component, frequency)
+        tmp_path = self.get_tmp_path(cache_path)
+        with open(tmp_path, 'wb') as file_ctx:
+            np.save(file_ctx, signal)
+        os.replace(tmp_path, cache_path)
+        self.logger.debug(f'Signal {path} ({component}, {frequency} Hz) '
+                          f'cached')
+        self.evict()
+
+    def evict(self):
+        files = []
+        for filename in os.listdir(self.root):
+            if not filename.endswith(f'.{CACHE_EXTENSION}'):
+                continue
+            cache_path = os.path.join(self.root, filename)
+            stat = os.stat(cache_path)
+            files.append((stat.st_mtime, stat.st_size, cache_path))
+
+        total_size = sum((x[1] for x in files))
+        for _, size, cache_path in sorted(files)[:-1]:
+            if total_size <= self.max_size:
+                break
+            os.remove(cache_path)
+            total_size -= size
+            self.logger.debug(f'Cache file {cache_path} evicted')
+
+    def read_signal(self, path: str, component: str,
+                    frequency: int) -> np.ndarray:
+        signal = self.get(path, component, frequency)
+        if signal is not None:
+            return signal
+
+        self.fill(path, [component], frequency)
+        return self.get(path, component, frequency)
+
+    def read_signals(self, path: str, components: List[str],
+                     frequency: int) -> Dict[str, np.ndarray]:
+        signals = {x: self.get(path, x, frequency) for x in components}
+        missing = [x for x, y in signals.items() if y is None]
+        if not missing:
+            return signals
+
+        self.fill(path, missing, frequency)
+        for component in missing:
+            signals[component] = self.get(path, component, frequency)
+        return signals
+
+    def fill(self, path: str, components: List[str], frequency: int):
+        bin_data = BinaryFile(path, resample_frequency=frequency)
+        datetime_start = bin_data.datetime_start
+        datetime_stop = bin_data.datetime_stop
+        samples_count = int(round(
+            (datetime_stop - datetime_start).total_seconds() * frequency))
+
+        targets = dict()
+        for component in components:
+            cache_path = self.get_cache_path(path, component, frequency)
+            tmp_path = f'{self.get_tmp_path(cache_path)}.fill'
+            targets[component] = (cache_path, tmp_path, open_memmap(
+                tmp_path, mode='w+', dtype=np.float64,
+                shape=(samples_count,)))
+
+        position = 0
+        block_start = datetime_start
+        while block_start < datetime_stop and position < samples_count:
+            block_stop = min(
+                block_start + timedelta(seconds=self.block_seconds),
+                datetime_stop)
+            bin_data.read_date_time_start = block_start
+            bin_data.read_date_time_stop = block_stop
+            block_size = 0
+            for component, (_, _, signal) in targets.items():
+                block = bin_data.read_signal(
+                    component)[:samples_count - position]
+                signal[position:position + block.shape[0]] = block
+                block_size = block.shape[0]
+            position += block_size
+            block_start = block_stop
+
+        for component, (cache_path, tmp_path, signal) in targets.items():
+            signal.flush()
+            if position < samples_count:
+                self.put(path, component, frequency, signal[:position])
+                os.remove(tmp_path)
+                continue
+            os.replace(tmp_path, cache_path)
+            self.logger.debug(f'Signal {path} ({component}, {frequency} Hz) '
+                              f'cached')
+        self.evict()
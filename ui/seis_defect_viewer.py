@@ -1,7 +1,8 @@
 import sys
 import os
+from collections import OrderedDict
 
-from typing import Dict, Tuple, List, NamedTuple
+from typing import Callable, Dict, Tuple, List, NamedTuple, Union
 
 import numpy as np
 
@@ -15,8 +16,20 @@ from PyQt5.uic import *
 from seiscore import BinaryFile
 from seiscore import Spectrogram
 
-from config import ConfigFile
+from config import ConfigFile, DEFAULT_VIEWER_CACHE_SIZE_MB
 from dbase import SqliteDbase
+from seismic_reader import open_raw_file, is_raw_access_supported
+from seismic_reader import ChannelStatsCache
+from signal_cache import ResampledSignalCache, CACHE_FOLDER_NAME
+from decimation import MinMaxPyramid
+
+
+LOADER_THREADS_COUNT = 2
+PREFETCH_FILES_COUNT = 2
+VIEW_PRIORITY = 1
+PREFETCH_PRIORITY = 0
+SIGNAL_PEN = (255, 0, 0)
+STACKED_SIGNAL_PENS = [(255, 0, 0), (0, 160, 0), (0, 0, 255)]
 
 
 def get_lib_path() -> list:
@@ -32,22 +45,193 @@ class FormData(NamedTuple):
     conclusion: str
 
 
+class SpectrogramImage(NamedTuple):
+    times: np.ndarray
+    frequencies: np.ndarray
+    amplitudes: np.ndarray
+    min_level: float
+    max_level: float
+
+
+SignalKey = Tuple[str, int, float]
+
+
+class FileSignals(NamedTuple):
+    path: str
+    resample_freq: int
+    mtime: float
+    frequency: int
+    pyramids: Dict[str, MinMaxPyramid]
+    spectrograms: Dict[str, Union[SpectrogramImage, None]]
+
+
+def get_signal_key(path: str, resample_freq: int) -> SignalKey:
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0.
+    return path, resample_freq, mtime
+
+
+def read_signals(path: str, components: List[str], resample_freq: int,
+                 channel_stats: ChannelStatsCache,
+                 signal_cache: ResampledSignalCache = None
+                 ) -> Tuple[Dict[str, np.ndarray], int]:
+    if is_raw_access_supported(path):
+        raw_file = open_raw_file(path)
+        if raw_file.frequency == resample_freq:
+            signals = dict()
+            for component in components:
+                mean = channel_stats.get_mean(path, component)
+                signals[component] = raw_file.get_channel(component) - mean
+            return signals, raw_file.frequency
+
+    if signal_cache is not None:
+        signals = signal_cache.read_signals(path, components, resample_freq)
+        return {x: y - channel_stats.get_mean(path, x)
+                for x, y in signals.items()}, resample_freq
+
+    bin_data = BinaryFile(path, use_avg_values=True,
+                          resample_frequency=resample_freq)
+    return {x: bin_data.read_signal(x) for x in components}, \
+        bin_data.resample_frequency
+
+
+def create_spectrogram_image(
+        signal: np.ndarray, frequency: int) -> Union[SpectrogramImage, None]:
+    spectrogram = Spectrogram(signal, frequency)
+    sp_data = spectrogram.sp_data
+    if sp_data.frequencies.shape[0] == 0:
+        return None
+
+    amplitudes = 20 * np.log10(abs(sp_data.amplitudes))
+    min_val, max_val = spectrogram.scale_limits()
+    return SpectrogramImage(sp_data.times, sp_data.frequencies,
+                            amplitudes.T, min_val, max_val)
+
+
+def get_file_signals_size(file_signals: FileSignals) -> int:
+    size = sum((x.nbytes for x in file_signals.pyramids.values()))
+    for spectrogram in file_signals.spectrograms.values():
+        if spectrogram is not None:
+            size += sum((x.nbytes for x in spectrogram[:3]))
+    return size
+
+
+class SignalMemoryCache:
+    def __init__(self, max_size_mb=DEFAULT_VIEWER_CACHE_SIZE_MB):
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.size = 0
+        self.__items = OrderedDict()
+
+    def get(self, key: SignalKey) -> Union[FileSignals, None]:
+        if key not in self.__items:
+            return None
+        self.__items.move_to_end(key)
+        return self.__items[key][0]
+
+    def put(self, key: SignalKey, file_signals: FileSignals):
+        size = get_file_signals_size(file_signals)
+        if size > self.max_size:
+            return
+        if key in self.__items:
+            self.size -= self.__items.pop(key)[1]
+        self.__items[key] = (file_signals, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, item_size) = self.__items.popitem(last=False)
+            self.size -= item_size
+
+
+class LoaderSignals(QtCore.QObject):
+    loaded = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(object, str)
+    cancelled = QtCore.pyqtSignal(object)
+
+
+class SignalLoader(QtCore.QRunnable):
+    def __init__(self, key: SignalKey, components: List[str],
+                 database: SqliteDbase, signals: LoaderSignals,
+                 signal_cache: ResampledSignalCache = None,
+                 is_cancelled: Callable[[SignalKey], bool] =
+                 lambda x: False):
+        super().__init__()
+        self.key = key
+        self.components = components
+        self.dbase_root = database.root
+        self.slow_query_seconds = database.slow_query_seconds
+        self.signal_cache = signal_cache
+        self.is_cancelled = is_cancelled
+        self.signals = signals
+
+    def load(self) -> Union[FileSignals, None]:
+        path, resample_freq, mtime = self.key
+        database = SqliteDbase(self.dbase_root, self.slow_query_seconds,
+                               is_read_only=True)
+        try:
+            signals, frequency = read_signals(
+                path, self.components, resample_freq,
+                ChannelStatsCache(database), self.signal_cache)
+        finally:
+            database.connection.close()
+        pyramids, spectrograms = dict(), dict()
+        for component, signal in signals.items():
+            if self.is_cancelled(self.key):
+                return None
+            pyramids[component] = MinMaxPyramid(signal)
+            spectrograms[component] = create_spectrogram_image(signal,
+                                                               frequency)
+        return FileSignals(path, resample_freq, mtime, frequency, pyramids,
+                           spectrograms)
+
+    def run(self):
+        if self.is_cancelled(self.key):
+            self.signals.cancelled.emit(self.key)
+            return
+        try:
+            file_signals = self.load()
+        except Exception as error:
+            self.signals.failed.emit(self.key,
+                                     f'{type(error).__name__}: {error}')
+            return
+        if file_signals is None:
+            self.signals.cancelled.emit(self.key)
+        else:
+            self.signals.loaded.emit(file_signals)
+
+
 class MainWindow:
-    def __init__(self, database: SqliteDbase):
+    def __init__(self, database: SqliteDbase,
+                 signal_cache: ResampledSignalCache = None,
+                 memory_cache_size_mb=DEFAULT_VIEWER_CACHE_SIZE_MB):
         self.__app = QApplication(sys.argv)
         self.__window = QMainWindow()
         self.__dbase = database
+        self.__signal_cache = signal_cache
+        self.__memory_cache = SignalMemoryCache(memory_cache_size_mb)
+        self.__thread_pool = QtCore.QThreadPool()
+        self.__thread_pool.setMaxThreadCount(LOADER_THREADS_COUNT)
+        self.__current_key = None
+        self.__prefetch_keys = set()
+        self.__pending_keys = set()
+        self.__loader_signals = LoaderSignals()
+        self.__loader_signals.loaded.connect(self.on_signals_loaded)
+        self.__loader_signals.failed.connect(self.on_signals_failed)
+        self.__loader_signals.cancelled.connect(self.on_signals_cancelled)
 
         ui_path = 'SeisDefectViewer.ui'
         self.__ui = loadUi(ui_path, self.__window)
         self.__ui.cbFilesList.currentTextChanged.connect(self.show_signal_data)
         self.__ui.cbComponentList.currentTextChanged.connect(self.show_signal_data)
         self.__ui.bSave.clicked.connect(self.save_checking_conclusion)
+        self.__ui.chStacked.stateChanged.connect(self.show_signal_data)
         self.__ui.sbFMin.valueChanged.connect(self.set_spectrogram_y_limits)
         self.__ui.sbFMax.valueChanged.connect(self.set_spectrogram_y_limits)
+        self.__ui.gSignal.sigXRangeChanged.connect(self.update_signal_curve)
 
         self.__files_info = None
         self.__spectrogram_plot = None
+        self.__pyramids = dict()
+        self.__signal_offsets = dict()
+        self.__signal_frequency = 0
+        self.__signal_curves = dict()
         self.update_lists()
 
         self.show_signal_data()
@@ -119,36 +303,131 @@ class MainWindow:
     def get_current_component(self) -> str:
         return self.form_data.component
 
-    def get_signal(self) -> Tuple[np.ndarray, int]:
-        _, path, _ = self.get_current_file_info()
-        component = self.get_current_component()
-        resample_freq = self.form_data.resample_freq
+    def is_key_obsolete(self, key: SignalKey) -> bool:
+        return key != self.__current_key and key not in self.__prefetch_keys
 
-        bin_data = BinaryFile(path, use_avg_values=True,
-                              resample_frequency=resample_freq)
-        return bin_data.read_signal(component), bin_data.resample_frequency
+    def request_signals(self, key: SignalKey, components: List[str],
+                        priority: int):
+        if key in self.__pending_keys:
+            return
+        self.__pending_keys.add(key)
+        loader = SignalLoader(key, components, self.dbase,
+                              self.__loader_signals, self.__signal_cache,
+                              self.is_key_obsolete)
+        self.__thread_pool.start(loader, priority)
+
+    def get_prefetch_files(self) -> List[Tuple[SignalKey, List[str]]]:
+        filenames = list(self.__files_info.keys())
+        filename = self.form_data.filename
+        if filename not in self.__files_info:
+            return []
 
-    def plot_signal(self, signal: np.ndarray, frequency: int):
+        resample_freq = self.form_data.resample_freq
+        index = filenames.index(filename)
+        files = []
+        for next_filename in filenames[index + 1:
+                                       index + 1 + PREFETCH_FILES_COUNT]:
+            _, path, components = self.__files_info[next_filename]
+            files.append((get_signal_key(path, resample_freq), components))
+        return files
+
+    def prefetch_signals(self):
+        files = self.get_prefetch_files()
+        self.__prefetch_keys = {x[0] for x in files}
+        for key, components in files:
+            if self.__memory_cache.get(key) is None:
+                self.request_signals(key, components, PREFETCH_PRIORITY)
+
+    def show_loaded_signals(self, file_signals: FileSignals):
+        component = self.get_current_component()
+        if self.ui.chStacked.isChecked():
+            pyramids = file_signals.pyramids
+        else:
+            pyramids = {component: file_signals.pyramids[component]}
+
+        self.ui.statusBar.clearMessage()
+        self.plot_signals(pyramids, file_signals.frequency)
+        self.plot_spectrogram(file_signals.spectrograms[component])
+        self.prefetch_signals()
+
+    def on_signals_loaded(self, file_signals: FileSignals):
+        key = (file_signals.path, file_signals.resample_freq,
+               file_signals.mtime)
+        self.__pending_keys.discard(key)
+        self.__memory_cache.put(key, file_signals)
+        if key == self.__current_key and \
+                self.get_current_component() in file_signals.pyramids:
+            self.show_loaded_signals(file_signals)
+
+    def on_signals_failed(self, key: SignalKey, error: str):
+        self.__pending_keys.discard(key)
+        if key == self.__current_key:
+            self.ui.statusBar.showMessage(
+                f'Ошибка загрузки сигнала: {error}')
+
+    def on_signals_cancelled(self, key: SignalKey):
+        self.__pending_keys.discard(key)
+        if key == self.__current_key:
+            self.show_signal_data()
+        elif key in self.__prefetch_keys:
+            self.prefetch_signals()
+
+    def plot_signals(self, pyramids: Dict[str, MinMaxPyramid],
+                     frequency: int):
         widget = self.ui.gSignal
         widget.clear()
-        time_scale = np.arange(0, signal.shape[0], 1) / frequency
-        widget.plot(time_scale, signal, pen=(255, 0, 0))
+        self.__pyramids, self.__signal_frequency = pyramids, frequency
+
+        ranges = [x.value_range for x in pyramids.values()]
+        step = max((x[1] - x[0] for x in ranges), default=0) or 1.
+        self.__signal_offsets = {x: -i * step
+                                 for i, x in enumerate(pyramids)}
+        if len(pyramids) == 1:
+            pens = [SIGNAL_PEN]
+        else:
+            pens = STACKED_SIGNAL_PENS
+        self.__signal_curves = {
+            x: widget.plot(pen=pens[i % len(pens)])
+            for i, x in enumerate(pyramids)}
+        self.update_signal_curve(index_min=0,
+                                 index_max=self.get_samples_count())
+
+    def get_samples_count(self) -> int:
+        return min((x.samples_count for x in self.__pyramids.values()))
+
+    def get_visible_signal_indexes(self) -> Tuple[int, int]:
+        samples_count = self.get_samples_count()
+        time_min, time_max = self.ui.gSignal.getViewBox().viewRange()[0]
+        index_min = max(int(np.floor(time_min * self.__signal_frequency)),
+                        0)
+        index_max = min(int(np.ceil(time_max * self.__signal_frequency)) + 1,
+                        samples_count)
+        if index_max - index_min < 2:
+            return 0, samples_count
+        return index_min, index_max
+
+    def update_signal_curve(self, *args, index_min=None, index_max=None):
+        if not self.__signal_curves:
+            return
+        if index_min is None or index_max is None:
+            index_min, index_max = self.get_visible_signal_indexes()
+
+        pixels_count = self.ui.gSignal.width()
+        for component, curve in self.__signal_curves.items():
+            indexes, values = self.__pyramids[component].decimate(
+                index_min, index_max, pixels_count)
+            times = indexes / self.__signal_frequency
+            curve.setData(times, values + self.__signal_offsets[component])
 
-    def plot_spectrogram(self, signal: np.ndarray, frequency: int):
+    def plot_spectrogram(self, spectrogram: Union[SpectrogramImage, None]):
         plot = self.ui.gSpectrogram
         plot.clear()
 
-        spectrogram = Spectrogram(signal, frequency)
-        sp_data = spectrogram.sp_data
-
-        if sp_data.frequencies.shape[0] == 0:
+        if spectrogram is None:
             return
 
-        time, frequencies = sp_data.times, sp_data.frequencies
-        amplitudes = sp_data.amplitudes
-
-        amplitudes = 20 * np.log10(abs(amplitudes))
-        amplitudes = amplitudes.T
+        time, frequencies = spectrogram.times, spectrogram.frequencies
+        amplitudes = spectrogram.amplitudes
 
         img = pg.ImageItem()
         img.setImage(amplitudes, xvals=time, yvals=frequencies)
@@ -158,8 +437,7 @@ class MainWindow:
         img.scale(dx, dy)
 
         hist = pg.HistogramLUTItem()
-        min_val, max_val = spectrogram.scale_limits()
-        hist.setLevels(min_val, max_val)
+        hist.setLevels(spectrogram.min_level, spectrogram.max_level)
         hist.gradient.restoreState(
             {'mode': 'rgb',
              'ticks': [
@@ -179,11 +457,20 @@ class MainWindow:
         if not self.get_current_component():
             return
         try:
-            signal, frequency = self.get_signal()
+            _, path, components = self.get_current_file_info()
         except KeyError:
             return
-        self.plot_signal(signal, frequency)
-        self.plot_spectrogram(signal, frequency)
+        key = get_signal_key(path, self.form_data.resample_freq)
+        self.__current_key = key
+
+        file_signals = self.__memory_cache.get(key)
+        if file_signals is not None and \
+                set(components) <= set(file_signals.pyramids):
+            self.show_loaded_signals(file_signals)
+            return
+        self.ui.statusBar.showMessage(
+            f'Загрузка {os.path.basename(path)}...')
+        self.request_signals(key, components, VIEW_PRIORITY)
 
     def save_checking_conclusion(self):
         filename = self.ui.cbFilesList.currentText()
@@ -205,7 +492,7 @@ class MainWindow:
 
 def run():
     QtCore.QCoreApplication.setLibraryPaths(get_lib_path())
-    MainWindow(db)
+    MainWindow(db, signal_cache, config.viewer_cache_size_mb)
 
 
 if __name__ == '__main__':
@@ -213,5 +500,8 @@ if __name__ == '__main__':
     conf_file = '/media/michael/Data/Projects/GraviSeismicComparation' \
                 '/ZapolarnoeDeposit/2021/config.json'
     config = ConfigFile(conf_file)
-    db = SqliteDbase(config.export_root)
+    db = SqliteDbase(config.export_root, config.slow_query_seconds)
+    signal_cache = ResampledSignalCache(
+        os.path.join(config.export_root, CACHE_FOLDER_NAME),
+        config.signal_cache_size_mb, config.read_block_seconds)
     run()
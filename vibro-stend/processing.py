@@ -9,6 +9,8 @@ from seiscore.functions.spectrum import spectrum
 from seiscore.functions.energy import spectrum_energy
 from seiscore.functions.filter import band_pass_filter
 
+from seismic_reader import ChunkedSignalReader
+
 from config import Config, StreamConfig, Limit, StendMeasure, Pair
 from scintrex import SG5File, DriftCorrectionFile, Measure
 
@@ -97,6 +99,8 @@ class PairProcessing:
         self.corrections = self.load_corrections()
         self.result_grav_data = self.load_result_gravimetric_file()
         self.seis_data = BinaryFile(self.config.seismic_file_path)
+        self.z_reader = ChunkedSignalReader(self.config.seismic_file_path,
+                                            'Z', remove_mean=False)
 
     def load_corrections(self) -> DriftCorrectionFile:
         path = self.config.drift_correction_file_path
@@ -117,9 +121,7 @@ class PairProcessing:
 
         seis_params = self.config.seismic_parameters
 
-        self.seis_data.read_date_time_start = dt_start
-        self.seis_data.read_date_time_stop = dt_stop
-        signal = self.seis_data.read_signal('Z')
+        signal = self.z_reader.read(dt_start, dt_stop)
 
         params = get_amplitude_energy_params(signal, seis_params.frequency,
                                              seis_params.energy_freq)
@@ -283,15 +285,12 @@ class MainProcessing:
         self.add_energy_corrections()
         for pair in self.pairs:
             records = pair.get_join_data()
-            seis_data = pair.seis_data
             for record in records:
                 freq = record.stend_measure.frequency
                 t_min = record.grav_measure.dt_start
                 t_max = record.grav_measure.dt_stop
 
-                seis_data.read_date_time_start = t_min
-                seis_data.read_date_time_stop = t_max
-                signal = pair.seis_data.read_signal('Z')
+                signal = pair.z_reader.read(t_min, t_max)
 
                 part_size = int(1000 / 6)
                 parts_count = int(signal.shape[0] / part_size)